@@ -0,0 +1,285 @@
+"""
+Аналітика цін оголошень: медіана, перцентилі та гістограми загалом і по містах.
+
+Колонки (id, місто, ціна, статус) усіх оголошень тримаються в пам'яті воркера як
+масиви NumPy, і вся статистика рахується над ними векторно, без GROUP BY по таблиці.
+Знімок повністю перечитується раз на ANALYTICS_REFRESH_SECONDS, а між цим crud
+позначає змінені оголошення (mark_changed), і наступний запит дочитує лише їх
+та нові рядки. Зміни з інших воркерів з'являються не пізніше повного перечитування.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import ANALYTICS_REFRESH_SECONDS
+
+STATUSES = ("pending", "approved", "rejected")
+PERCENTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+
+# Якщо змінених оголошень більше (наприклад, після масової модерації за фільтром),
+# дешевше перечитати знімок повністю, ніж передавати довгий IN (...)
+_MAX_INCREMENTAL_IDS = 1000
+
+
+@dataclass(frozen=True)
+class _Columns:
+    """Незмінний стан знімка: запити читають його без блокування, оновлення замінює цілком."""
+    ids: np.ndarray
+    cities: np.ndarray
+    prices: np.ndarray
+    statuses: np.ndarray
+    city_names: tuple
+    version: int
+    loaded_at: float
+    generated_at: datetime
+
+    @property
+    def max_id(self):
+        return int(self.ids.max()) if len(self.ids) else 0
+
+
+def _percentiles(prices, starts, counts):
+    """Перцентилі кожної групи відсортованого масиву цін з лінійною інтерполяцією, як у np.percentile."""
+    values = {}
+    for name, q in PERCENTILES.items():
+        position = starts + (counts - 1) * q
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        values[name] = prices[low] + (prices[high] - prices[low]) * (position - low)
+    return values
+
+
+def _histograms(prices, groups, minimums, maximums, bins):
+    """Гістограма на bins кошиків для кожної групи в межах її власних min..max одним bincount."""
+    span = (maximums - minimums)[groups]
+    # Група з однаковими цінами потрапляє в середній кошик діапазону value ± 0.5, як у np.histogram
+    scaled = np.divide(prices - minimums[groups], span, out=np.full_like(prices, 0.5), where=span > 0)
+    buckets = np.minimum((scaled * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(groups * bins + buckets, minlength=len(minimums) * bins)
+    return counts.reshape(len(minimums), bins)
+
+
+def _summaries(prices, starts, counts, bins):
+    """Підсумки для груп [starts[i], starts[i] + counts[i]) відсортованого масиву цін."""
+    if not len(counts):
+        return []
+    groups = np.repeat(np.arange(len(counts)), counts)
+    minimums = prices[starts]
+    maximums = prices[starts + counts - 1]
+    means = np.add.reduceat(prices, starts) / counts
+    percentiles = _percentiles(prices, starts, counts)
+    histograms = _histograms(prices, groups, minimums, maximums, bins)
+
+    summaries = []
+    for i in range(len(counts)):
+        low, high = (minimums[i], maximums[i]) if maximums[i] > minimums[i] else (minimums[i] - 0.5, maximums[i] + 0.5)
+        edges = np.linspace(low, high, bins + 1)
+        summary = {
+            "count": int(counts[i]),
+            "mean": round(float(means[i]), 2),
+            "min": float(minimums[i]),
+            "max": float(maximums[i]),
+        }
+        summary.update({name: round(float(values[i]), 2) for name, values in percentiles.items()})
+        summary["histogram"] = {
+            "edges": [round(float(edge), 2) for edge in edges],
+            "counts": histograms[i].tolist(),
+        }
+        summaries.append(summary)
+    return summaries
+
+
+class _Report:
+    """Порахована статистика одного статусу; ціни відсортовані за (місто, ціна) для price_rank."""
+
+    def __init__(self, columns: _Columns, status: str, bins: int):
+        mask = columns.statuses == STATUSES.index(status)
+        cities = columns.cities[mask]
+        prices = columns.prices[mask]
+        order = np.lexsort((prices, cities))
+        self.cities = cities[order]
+        self.prices = prices[order]
+
+        codes, starts, counts = np.unique(self.cities, return_index=True, return_counts=True)
+        self.groups = {int(code): (int(start), int(count)) for code, start, count in zip(codes, starts, counts)}
+        self.sorted_prices = np.sort(self.prices)
+
+        self.status = status
+        self.generated_at = columns.generated_at
+        self.city_names = columns.city_names
+        overall = _summaries(self.sorted_prices, np.array([0]), np.array([len(self.prices)]), bins) if len(self.prices) else []
+        self.overall = overall[0] if overall else None
+        self.by_city = {
+            columns.city_names[code]: summary
+            for code, summary in zip(codes.tolist(), _summaries(self.prices, starts, counts, bins))
+        }
+
+    def price_rank(self, price: float, city: str = None):
+        """Відсоток оголошень (у місті або загалом), дешевших за price."""
+        if city is None:
+            prices = self.sorted_prices
+        else:
+            code = self.city_names.index(city) if city in self.city_names else None
+            if code is None or code not in self.groups:
+                return None
+            start, count = self.groups[code]
+            prices = self.prices[start:start + count]
+        if not len(prices):
+            return None
+        return round(float(np.searchsorted(prices, price, side="left")) / len(prices) * 100, 1)
+
+
+class PriceSnapshot:
+    """Знімок колонок для аналітики цін з інкрементальним оновленням."""
+
+    def __init__(self, refresh_seconds: float = ANALYTICS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._columns = None
+        self._changed_ids = set()
+        self._changed = False
+        self._reload = False
+        self._reports = {}
+        self._lock = threading.Lock()
+        # Окремий короткий замок для позначок змін: _lock тримається на весь запит до БД,
+        # а crud позначає зміни після кожного commit і не має на нього чекати
+        self._changes_lock = threading.Lock()
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def mark_changed(self, *apartment_ids: int):
+        """
+        Позначає оголошення створеними, зміненими чи видаленими (викликається після commit).
+        Без аргументів - з'явились нові оголошення, id яких невідомі (масовий імпорт).
+        """
+        with self._changes_lock:
+            self._changed_ids.update(apartment_ids)
+            self._changed = True
+
+    def invalidate(self):
+        """Змінено невідомо які оголошення: наступне оновлення перечитає все."""
+        with self._changes_lock:
+            self._reload = True
+
+    def _take_changes(self):
+        # Позначки забираються разом, тож зроблена під час оновлення не загубиться
+        with self._changes_lock:
+            changes = self._changed_ids, self._changed, self._reload
+            self._changed_ids, self._changed, self._reload = set(), False, False
+        return changes
+
+    def _restore_changes(self, changed_ids, changed, reload):
+        with self._changes_lock:
+            self._changed_ids.update(changed_ids)
+            self._changed = self._changed or changed
+            self._reload = self._reload or reload
+
+    def _select(self, db: Session, condition=None):
+        query = (
+            select(models.Apartment.id, models.Location.city, models.Apartment.price, models.Apartment.status)
+            .join(models.Location, models.Location.id == models.Apartment.location_id)
+            .where(models.Apartment.price.isnot(None))
+        )
+        if condition is not None:
+            query = query.where(condition)
+        return db.execute(query).all()
+
+    def _columns_from(self, rows, city_names, ids=None, cities=None, prices=None, statuses=None):
+        codes = {name: code for code, name in enumerate(city_names)}
+        status_codes = {status: code for code, status in enumerate(STATUSES)}
+        # Транспонуємо рядки один раз: звертатися до атрибутів кожного рядка в 4 проходи помітно довше
+        row_ids, row_cities, row_prices, row_statuses = zip(*rows) if rows else ((), (), (), ())
+        for city in set(row_cities) - codes.keys():
+            codes[city] = len(city_names)
+            city_names.append(city)
+
+        new = (
+            np.array(row_ids, dtype=np.int64),
+            np.array([codes[city] for city in row_cities], dtype=np.int32),
+            np.array(row_prices, dtype=np.float64),
+            np.array([status_codes.get(status, -1) for status in row_statuses], dtype=np.int8),
+        )
+        if ids is not None:
+            new = tuple(np.concatenate(pair) for pair in zip((ids, cities, prices, statuses), new))
+
+        previous = self._columns
+        return _Columns(
+            *new,
+            city_names=tuple(city_names),
+            version=previous.version + 1 if previous else 1,
+            loaded_at=time.monotonic(),
+            generated_at=datetime.utcnow(),
+        )
+
+    def _load(self, db: Session):
+        rows = self._select(db)
+        self._columns = self._columns_from(rows, [])
+        self.full_loads += 1
+
+    def _apply_changes(self, db: Session, changed_ids):
+        columns = self._columns
+        # crud імпортує цей модуль, тож database (і драйвери БД) підтягуємо лише тут
+        from .database import read_from_replica
+        # Зміни читаємо з основної бази: репліка могла ще не отримати щойно записане
+        token = read_from_replica.set(False)
+        try:
+            condition = models.Apartment.id > columns.max_id
+            if changed_ids:
+                condition = or_(condition, models.Apartment.id.in_(changed_ids))
+            rows = self._select(db, condition)
+        finally:
+            read_from_replica.reset(token)
+
+        keep = ~np.isin(columns.ids, np.fromiter(changed_ids, dtype=np.int64, count=len(changed_ids)))
+        self._columns = self._columns_from(
+            rows, list(columns.city_names),
+            columns.ids[keep], columns.cities[keep], columns.prices[keep], columns.statuses[keep],
+        )
+        self.incremental_loads += 1
+
+    def refresh(self, db: Session):
+        """Оновлює знімок, якщо він застарів або є зміни. Повертає актуальний стан."""
+        with self._lock:
+            columns = self._columns
+            changed_ids, changed, reload = self._take_changes()
+            try:
+                if columns is None or reload or time.monotonic() - columns.loaded_at >= self.refresh_seconds \
+                        or len(changed_ids) > _MAX_INCREMENTAL_IDS:
+                    self._load(db)
+                elif changed:
+                    self._apply_changes(db, changed_ids)
+            except Exception:
+                self._restore_changes(changed_ids, changed, reload)
+                raise
+            return self._columns
+
+    def report(self, db: Session, status: str = "approved", bins: int = 10):
+        """Статистика цін за статусом; рахується один раз на версію знімка."""
+        columns = self.refresh(db)
+        key = (columns.version, status, bins)
+        report = self._reports.get(key)
+        if report is None:
+            report = _Report(columns, status, bins)
+            # Звіти попередніх версій більше не знадобляться
+            self._reports = {k: v for k, v in self._reports.items() if k[0] == columns.version}
+            self._reports[key] = report
+        return report
+
+    def stats(self):
+        columns = self._columns
+        return {
+            "rows": len(columns.ids) if columns else 0,
+            "version": columns.version if columns else 0,
+            "age_seconds": round(time.monotonic() - columns.loaded_at, 1) if columns else None,
+            "pending_changes": len(self._changed_ids),
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+        }
+
+
+price_snapshot = PriceSnapshot()
@@ -0,0 +1,303 @@
+from typing import List, Literal, Optional, Union
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas, async_crud, auth
+from .analytics import price_snapshot
+from .recommendations import similar_index
+from .config import PAGE_SIZE, MAX_PAGE_SIZE, NDJSON_CHUNK_SIZE, BULK_IMPORT_MAX_ROWS, SIMILAR_APARTMENTS
+from .database import get_db, get_async_db, AsyncSessionLocal
+from .pagination import InvalidCursor
+
+# Відповіді серіалізуються через orjson; маршрути повертають готові ORJSONResponse,
+# тож FastAPI не валідує їх повторно через response_model (він лишається для документації)
+router = APIRouter(prefix="/api", tags=["api"], default_response_class=ORJSONResponse)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def serialize(schema, objects):
+    """ORM-об'єкти -> словники через pydantic-схему (лише поля, описані в схемі)."""
+    return [schema.model_validate(obj).model_dump() for obj in objects]
+
+
+def page_response(page, schema=schemas.Apartment):
+    return ORJSONResponse({
+        "items": serialize(schema, page.items),
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+
+
+async def stream_apartments(cursor: Optional[str], current_user: models.User):
+    """
+    Усі доступні оголошення у форматі NDJSON, по одному на рядок.
+    Дані вибираються keyset-сторінками по NDJSON_CHUNK_SIZE у власній сесії,
+    бо сесія із залежності закривається до початку стрімінгу.
+    """
+    async with AsyncSessionLocal() as db:
+        while True:
+            page = await async_crud.get_apartments_page(db, NDJSON_CHUNK_SIZE, cursor, current_user=current_user)
+            if page.items:
+                yield b"".join(orjson.dumps(item) + b"\n" for item in serialize(schemas.Apartment, page.items))
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+            db.expunge_all()
+
+
+def _row_error(number: int, field: str, message: str):
+    return {"row": number, "errors": [{"field": field, "message": message}]}
+
+
+def parse_bulk_rows(body: bytes, content_type: str):
+    """
+    Тіло запиту масового імпорту (JSON-масив або NDJSON) -> пари (номер, сирий рядок) та помилки розбору.
+    Номер - позиція в масиві або номер рядка NDJSON-файлу (з нуля, як і позиція в масиві).
+    Некоректний рядок NDJSON стає помилкою свого рядка, решта імпортується.
+    """
+    if NDJSON_MEDIA_TYPE in content_type:
+        rows, errors = [], []
+        # Номер рядка - номер рядка у файлі, тож порожні рядки пропускаємо вже після нумерації
+        for number, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                rows.append((number, orjson.loads(line)))
+            except orjson.JSONDecodeError as exc:
+                errors.append(_row_error(number, "", f"Malformed JSON: {exc}"))
+        return rows, errors
+
+    try:
+        rows = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Malformed JSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of apartments")
+    return list(enumerate(rows)), []
+
+
+def validate_bulk_rows(rows):
+    """Валідує пари (номер, рядок) через ApartmentCreate; повертає коректні оголошення та помилки з номерами рядків."""
+    apartments, errors = [], []
+    for number, row in rows:
+        try:
+            apartments.append(schemas.ApartmentCreate.model_validate(row))
+        except ValidationError as exc:
+            errors.append({
+                "row": number,
+                "errors": [
+                    {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                    for error in exc.errors()
+                ],
+            })
+    return apartments, errors
+
+
+@router.post("/apartments/bulk")
+async def bulk_create_apartments(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Масове створення оголошень поточного користувача з JSON-масиву
+    або NDJSON (Content-Type: application/x-ndjson).
+    Коректні рядки вставляються пакетами в одній транзакції, помилкові повертаються з номерами.
+    """
+    body = await request.body()
+    # Розбір і валідація тисяч рядків - робота CPU, тож виносимо її з циклу подій
+    rows, parse_errors = await run_in_threadpool(parse_bulk_rows, body, request.headers.get("content-type", ""))
+    if len(rows) + len(parse_errors) > BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Too many rows, maximum is {BULK_IMPORT_MAX_ROWS}")
+
+    apartments, errors = await run_in_threadpool(validate_bulk_rows, rows)
+    errors = sorted(parse_errors + errors, key=lambda error: error["row"])
+    created = await async_crud.bulk_create_apartments(db, apartments, current_user)
+    return ORJSONResponse({"created": created, "failed": len(errors), "errors": errors})
+
+
+@router.get("/apartments", response_model=schemas.ApartmentPage)
+async def list_apartments(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """
+    Список оголошень з курсорною пагінацією.
+    З format=ndjson або Accept: application/x-ndjson повертає потік усіх оголошень, починаючи з cursor.
+    """
+    try:
+        if format == "ndjson" or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            # Перевіряємо курсор до початку стрімінгу, щоб повернути 400, а не обірваний потік
+            await async_crud.get_apartments_page(db, 1, cursor, current_user=current_user)
+            return StreamingResponse(stream_apartments(cursor, current_user), media_type=NDJSON_MEDIA_TYPE)
+
+        page = await async_crud.get_apartments_page(db, limit, cursor, current_user=current_user)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return page_response(page)
+
+@router.get("/apartments/search", response_model=schemas.ApartmentPage)
+async def search_apartments(
+    city: Optional[str] = None,
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    status: Optional[Literal["pending", "approved", "rejected"]] = None,
+    sort: Literal["price", "recent"] = "recent",
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """
+    Пошук оголошень за містом, ціною та статусом.
+    Фільтр за статусом діє лише для адміністраторів, решта бачить одобрені оголошення.
+    """
+    try:
+        page = await async_crud.search_apartments(
+            db, limit, cursor,
+            city=city, min_price=min_price, max_price=max_price,
+            status=status, sort=sort, current_user=current_user
+        )
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return page_response(page)
+
+@router.get("/apartments/fulltext", response_model=List[schemas.Apartment])
+async def fulltext_search_apartments(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """Повнотекстовий пошук за назвою та описом, результати впорядковані за релевантністю."""
+    apartments = await async_crud.fulltext_search_apartments(db, q, limit, current_user=current_user)
+    return ORJSONResponse(serialize(schemas.Apartment, apartments))
+
+@router.get("/analytics/prices", response_model=schemas.PriceAnalytics)
+def price_analytics(
+    city: Optional[str] = None,
+    price: Optional[float] = Query(None, ge=0),
+    status: Literal["pending", "approved", "rejected"] = "approved",
+    bins: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """
+    Медіана, перцентилі та гістограма цін загалом і по містах зі знімка в пам'яті.
+    city звужує список міст, price додає відсоток дешевших оголошень (у місті або загалом).
+    Статистика за іншими статусами, ніж approved, доступна лише адміністраторам.
+    Маршрут синхронний: оновлення знімка і розрахунки NumPy виконуються в threadpool.
+    """
+    if current_user is None or not current_user.is_admin:
+        status = "approved"
+
+    report = price_snapshot.report(db, status, bins)
+    cities = report.by_city if city is None else {city: report.by_city[city]} if city in report.by_city else {}
+    return ORJSONResponse({
+        "status": report.status,
+        "generated_at": report.generated_at.isoformat(),
+        "overall": report.overall,
+        "cities": [{"city": name, **summary} for name, summary in sorted(cities.items())],
+        "price_rank": report.price_rank(price, city) if price is not None else None,
+    })
+
+@router.get("/apartments/{apartment_id}", response_model=Union[schemas.ApartmentAdmin, schemas.Apartment])
+async def get_apartment(
+    apartment_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """
+    Одне оголошення. Адміністратор отримує розширену модель з даними власника.
+    Неодобрені оголошення та оголошення заблокованих власників бачать лише власник і адміністратор.
+    """
+    apartment = await async_crud.get_apartment(db, apartment_id)
+    if not apartment:
+        raise HTTPException(status_code=404, detail="Apartment not found")
+
+    if current_user is not None and current_user.is_admin:
+        return ORJSONResponse(serialize(schemas.ApartmentAdmin, [apartment])[0])
+
+    is_owner = current_user is not None and current_user.id == apartment.owner_id
+    if not is_owner and (apartment.status != "approved" or not apartment.owner.is_active):
+        raise HTTPException(status_code=404, detail="Apartment not found")
+
+    return ORJSONResponse(serialize(schemas.Apartment, [apartment])[0])
+
+@router.get("/apartments/{apartment_id}/similar", response_model=List[schemas.Apartment])
+async def similar_apartments(
+    apartment_id: int,
+    limit: int = Query(SIMILAR_APARTMENTS, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_from_cookie)
+):
+    """
+    Найсхожіші за ціною, містом і текстом доступні оголошення з того самого міста, від найсхожішого.
+    Оголошення, яке не можна переглянути, дає 404, як і в GET /api/apartments/{apartment_id}.
+    """
+    apartment = await async_crud.get_apartment(db, apartment_id)
+    if not apartment:
+        raise HTTPException(status_code=404, detail="Apartment not found")
+
+    can_see_hidden = current_user is not None and (current_user.is_admin or current_user.id == apartment.owner_id)
+    if not can_see_hidden and (apartment.status != "approved" or not apartment.owner.is_active):
+        raise HTTPException(status_code=404, detail="Apartment not found")
+
+    similar = await async_crud.get_apartments_by_ids(
+        db, similar_index.similar(apartment, limit), current_user=current_user
+    )
+    return ORJSONResponse(serialize(schemas.Apartment, similar))
+
+
+@router.get("/admin/users", response_model=schemas.UserAdminPage)
+async def admin_users(
+    q: Optional[str] = Query(None, max_length=100),
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    """Користувачі для адмін-панелі сторінками за id; q - початок email."""
+    try:
+        page = await async_crud.get_users_page(db, limit, cursor, q)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(page, schemas.UserAdmin)
+
+@router.get("/admin/apartments/pending", response_model=schemas.ApartmentAdminPage)
+async def admin_pending_apartments(
+    q: Optional[str] = Query(None, max_length=100),
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    """Оголошення, що очікують модерації, від найстаріших; q - підрядок назви."""
+    try:
+        page = await async_crud.get_pending_apartments_page(db, limit, cursor, q)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return page_response(page, schemas.ApartmentAdmin)
+
+
+@router.post("/admin/apartments/moderate", response_model=schemas.BulkModerationResult)
+async def bulk_moderate_apartments(
+    moderation: schemas.BulkModeration,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(auth.get_current_admin)
+):
+    """Масова модерація оголошень за списком ID або фільтром; повертає JSON-підсумок."""
+    return await async_crud.bulk_moderate_apartments(
+        db, moderation.status, current_user.id, ids=moderation.ids, filter=moderation.filter
+    )
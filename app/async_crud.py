@@ -0,0 +1,55 @@
+"""
+Асинхронні версії функцій crud для async-маршрутів.
+
+Кожна функція виконує синхронну реалізацію з crud через AsyncSession.run_sync:
+SQLAlchemy передає керування циклу подій на кожному зверненні до БД, тому
+запити не блокують воркер, а логіка запитів залишається в одному місці.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models, schemas
+
+
+async def get_user(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_user, email)
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, password_hash: str):
+    return await db.run_sync(crud.create_user, user, password_hash)
+
+async def update_user_password(db: AsyncSession, user_id: int, password_hash: str):
+    return await db.run_sync(crud.update_user_password, user_id, password_hash)
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user_by_id, user_id)
+
+async def get_apartment(db: AsyncSession, apartment_id: int):
+    return await db.run_sync(crud.get_apartment, apartment_id)
+
+async def get_apartments_page(db: AsyncSession, limit: int, cursor: str = None, current_user: models.User = None):
+    return await db.run_sync(crud.get_apartments_page, limit, cursor, current_user=current_user)
+
+async def get_apartments_page_versions(db: AsyncSession, limit: int, cursor: str = None, current_user: models.User = None):
+    return await db.run_sync(crud.get_apartments_page_versions, limit, cursor, current_user=current_user)
+
+async def get_apartments_by_ids(db: AsyncSession, ids, current_user: models.User = None):
+    return await db.run_sync(crud.get_apartments_by_ids, ids, current_user=current_user)
+
+async def search_apartments(db: AsyncSession, limit: int, cursor: str = None, **filters):
+    return await db.run_sync(crud.search_apartments, limit, cursor, **filters)
+
+async def fulltext_search_apartments(db: AsyncSession, q: str, limit: int, current_user: models.User = None):
+    return await db.run_sync(crud.fulltext_search_apartments, q, limit, current_user)
+
+async def bulk_create_apartments(db: AsyncSession, apartments, owner: models.User):
+    return await db.run_sync(crud.bulk_create_apartments, apartments, owner)
+
+async def bulk_moderate_apartments(db: AsyncSession, status: str, moderator_id: int, ids=None, filter=None):
+    return await db.run_sync(crud.bulk_moderate_apartments, status, moderator_id, ids, filter)
+
+async def get_users_page(db: AsyncSession, limit: int, cursor: str = None, q: str = None):
+    return await db.run_sync(crud.get_users_page, limit, cursor, q)
+
+async def get_pending_apartments_page(db: AsyncSession, limit: int, cursor: str = None, q: str = None):
+    return await db.run_sync(crud.get_pending_apartments_page, limit, cursor, q)
+
+async def get_system_stats(db: AsyncSession):
+    return await db.run_sync(crud.get_system_stats)
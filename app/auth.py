@@ -1,59 +1,88 @@
-from fastapi import Depends, HTTPException, Request
+from fastapi import HTTPException, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from .config import SECRET_KEY, ALGORITHM
 from .models import User
-from .database import get_db
+from .database import AsyncSessionLocal
+from .cache import user_cache
+
+# Позначка, що middleware ще не визначив користувача для цього запиту
+_UNRESOLVED = object()
 
 def create_access_token(data: dict):
     """Створення токену для доступу"""
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)) -> User:
-    """
-    Повертає поточного користувача на основі токену в cookie.
-    Якщо користувач не авторизований, повертає None.
-    """
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
-
+def get_token_subject(token: str):
+    """Повертає email з токену або None, якщо токен недійсний."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email: str = payload.get("sub")
-        if not user_email:
-            return None
     except JWTError:
         return None
+    return payload.get("sub") or None
 
+def load_user(db: Session, user_email: str):
+    """
+    Завантажує користувача з БД і кладе його в кеш.
+    Користувач від'єднується від сесії, щоб його можна було
+    безпечно використовувати в наступних запитах.
+    """
     user = db.query(User).filter(User.email == user_email).first()
-    if not user:
+    if user is not None:
+        db.expunge(user)
+        user_cache.set(user_email, user)
+    return user
+
+async def resolve_user(token: str):
+    """
+    Повертає користувача за токеном: спершу з кешу, інакше одним запитом
+    через асинхронну сесію. Для відсутнього чи недійсного токену — None.
+    """
+    if not token:
         return None
 
+    user_email = get_token_subject(token)
+    if not user_email:
+        return None
+
+    user = user_cache.get(user_email)
+    if user is not None:
+        return user
+
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(load_user, user_email)
+
+async def get_current_user_from_cookie(request: Request) -> User:
+    """
+    Повертає поточного користувача на основі токену в cookie.
+    Якщо користувач не авторизований, повертає None.
+    Користувача вже визначив CurrentUserMiddleware, тут лише читаємо request.state.
+    """
+    user = getattr(request.state, "current_user", _UNRESOLVED)
+    if user is _UNRESOLVED:
+        # Middleware не підключено (наприклад, в окремому застосунку) — визначаємо самі
+        user = await resolve_user(request.cookies.get("access_token"))
+        request.state.current_user = user
     return user
 
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request):
     """
     Повертає поточного авторизованого користувача.
     Якщо користувач не авторизований або токен недійсний — кидає помилку 401.
     """
-    token = request.cookies.get("access_token")
-    
-    if not token:
+    if not request.cookies.get("access_token"):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email: str = payload.get("sub")
-
-        if not user_email:
-            raise HTTPException(status_code=401, detail="Could not validate credentials")
-    except JWTError:
+    user = await get_current_user_from_cookie(request)
+    if not user:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
-    user = db.query(User).filter(User.email == user_email).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
+    return user
 
+async def get_current_admin(request: Request):
+    """Як get_current_user, але для не-адміністраторів кидає помилку 403."""
+    user = await get_current_user(request)
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Access denied. Admin privileges required.")
     return user
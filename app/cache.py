@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+from .config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS, LOCATION_CACHE_SIZE
+
+
+class TTLCache:
+    """
+    Потокобезпечний LRU-кеш з обмеженим розміром і часом життя записів.
+    Якщо ttl дорівнює None, записи живуть доки їх не витіснить LRU.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# Ідентифікатори локацій за адресою (city, street, house_number).
+# Локації не змінюються і не видаляються, тому TTL не потрібен
+location_cache = TTLCache(LOCATION_CACHE_SIZE)
+
+# Користувачі, знайдені за subject (email) з JWT-токена
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
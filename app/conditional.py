@@ -0,0 +1,72 @@
+"""Умовні GET-запити: ETag / Last-Modified та відповіді 304 Not Modified."""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+from .config import CACHE_VERSION
+
+
+def version_of(apartment):
+    """Момент останньої зміни оголошення: створення, редагування або модерація."""
+    stamps = [apartment.created_at, apartment.updated_at, apartment.moderated_at]
+    return max((stamp for stamp in stamps if stamp is not None), default=None)
+
+
+def _user_key(current_user):
+    # Сторінки відрізняються для власника, адміністратора та анонімного користувача
+    if current_user is None:
+        return "anonymous"
+    return f"{current_user.id}:{int(bool(current_user.is_admin))}"
+
+
+def validators(current_user, apartments, *extra):
+    """
+    ETag та Last-Modified для набору оголошень (однієї сторінки або списку).
+    Приймає як ORM-об'єкти, так і рядки з колонками id, created_at, updated_at, moderated_at, status.
+    """
+    parts = [CACHE_VERSION, _user_key(current_user), *extra]
+    parts += [(a.id, a.status, version_of(a)) for a in apartments]
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    last_modified = max((version_of(a) for a in apartments if version_of(a)), default=None)
+    return f'W/"{digest}"', last_modified
+
+
+def _as_utc(value: datetime):
+    # У БД дати зберігаються без часового поясу в UTC
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value.tzinfo is None else value.replace(microsecond=0)
+
+
+def has_validators(request: Request):
+    """Чи надіслав клієнт заголовки умовного запиту."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime = None):
+    """Чи збігається копія клієнта з поточною версією (RFC 9110: If-None-Match має пріоритет)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified) <= since
+    return False
+
+
+def set_validators(response: Response, etag: str, last_modified: datetime = None):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    # Сторінки залежать від користувача, тому кешувати їх можна лише в браузері з перевіркою
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(etag: str, last_modified: datetime = None):
+    return set_validators(Response(status_code=304), etag, last_modified)
@@ -1,12 +1,22 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from . import models, schemas
+from sqlalchemy.orm import Session, joinedload, contains_eager
+import re
+from sqlalchemy import func, case, true, insert, tuple_, select, literal_column, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.exc import IntegrityError
+from . import models, schemas, pagination
+from .config import MATERIALIZED_STATS, BULK_INSERT_BATCH_SIZE
+from .cache import user_cache, location_cache
+from .fragments import invalidate_card
+from .analytics import price_snapshot
+from .recommendations import similar_index
 from datetime import datetime
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    db_user = models.User( password = user.password, email=user.email, first_name=user.first_name, last_name=user.last_name, phone=user.phone)
+def create_user(db: Session, user: schemas.UserCreate, password_hash: str):
+    # Пароль хешує викликач (security.hash_password), щоб bcrypt не виконувався в транзакції
+    db_user = models.User( password = password_hash, email=user.email, first_name=user.first_name, last_name=user.last_name, phone=user.phone)
     db.add(db_user)
+    _bump_stats(db, total_users=1, active_users=1)
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -18,8 +28,8 @@ def get_user_by_id(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
     
 def create_apartment(db: Session, apartment: schemas.ApartmentCreate, current_user_id: int):
-    db_location = create_location(db, apartment.location)
-    
+    location_id = get_or_create_location(db, apartment.location)
+
     # Отримуємо користувача
     user = db.query(models.User).filter(models.User.id == current_user_id).first()
     
@@ -31,69 +41,221 @@ def create_apartment(db: Session, apartment: schemas.ApartmentCreate, current_us
         description=apartment.description,
         price=apartment.price,
         owner_id=current_user_id,
-        location_id=db_location.id,
+        location_id=location_id,
         status=status
     )
 
+    new_owner = MATERIALIZED_STATS and not _has_apartments(db, current_user_id)
     db.add(db_apartment)
+    _bump_stats(db, total_apartments=1, price_total=int(apartment.price), total_owners=int(new_owner), **{_STATUS_COUNTERS[status]: 1})
     db.commit()
     db.refresh(db_apartment)
+    _apartments_changed(db_apartment.id)
     return db_apartment
 
 
 def get_user_apartments(db: Session, user_id: int):
-    return db.query(models.Apartment).filter(models.Apartment.owner_id == user_id).all()
+    return (
+        db.query(models.Apartment)
+        .options(joinedload(models.Apartment.location))
+        .filter(models.Apartment.owner_id == user_id)
+        .all()
+    )
 
 def get_apartment(db: Session, apartment_id: int):
-    return db.query(models.Apartment).filter(models.Apartment.id == apartment_id).first()
+    # Локація та власник потрібні сторінці оголошення, тому вантажимо їх одним запитом
+    return (
+        db.query(models.Apartment)
+        .options(joinedload(models.Apartment.location), joinedload(models.Apartment.owner))
+        .filter(models.Apartment.id == apartment_id)
+        .first()
+    )
 
 def get_all_apartments(db: Session):
-    return db.query(models.Apartment).all()
+    return db.query(models.Apartment).options(joinedload(models.Apartment.location)).all()
 
 def update_apartment(db: Session, apartment_id: int, apartment: schemas.ApartmentUpdate):
     apartment_data = apartment.dict(exclude_unset=True)
 
     location_data = apartment_data.pop('location', None)  
-    location_db = db.query(models.Location).filter(models.Location.apartments.any(id=apartment_id)).first()
-
-    if location_db and location_data:
-        location_db.city = location_data["city"]
-        location_db.street = location_data["street"]
-        location_db.house_number = location_data["house_number"]
-        db.commit()
+    if MATERIALIZED_STATS and 'price' in apartment_data:
+        old_price = db.query(models.Apartment.price).filter(models.Apartment.id == apartment_id).scalar() or 0
+        _bump_stats(db, price_total=int(apartment_data['price']) - old_price)
+    # Локацію можуть ділити кілька оголошень, тому не змінюємо її, а переносимо оголошення на іншу адресу
+    if location_data:
+        apartment_data['location_id'] = get_or_create_location(db, schemas.LocationCreate(**location_data))
 
     db.query(models.Apartment).filter(models.Apartment.id == apartment_id).update(apartment_data)
     db.commit()
+    invalidate_card(apartment_id)
+    _apartments_changed(apartment_id)
 
     return db.query(models.Apartment).filter(models.Apartment.id == apartment_id).first()
 
 def delete_apartment(db: Session, apartment_id: int):
-    db.query(models.Apartment).filter(models.Apartment.id == apartment_id).delete()
+    if MATERIALIZED_STATS:
+        apartment = db.query(models.Apartment).filter(models.Apartment.id == apartment_id).first()
+        if apartment:
+            db.delete(apartment)
+            db.flush()
+            lost_owner = not _has_apartments(db, apartment.owner_id)
+            _bump_stats(db, total_apartments=-1, price_total=-(apartment.price or 0), total_owners=-int(lost_owner), **{_STATUS_COUNTERS[apartment.status]: -1})
+    else:
+        db.query(models.Apartment).filter(models.Apartment.id == apartment_id).delete()
     db.commit()
+    invalidate_card(apartment_id)
+    _apartments_changed(apartment_id)
     return True
 
-def create_location(db: Session, location: schemas.LocationCreate):
-    db_location = models.Location(
-        city=location.city,
-        street=location.street,
-        house_number=location.house_number
+def location_key(location):
+    return (location.city, location.street, location.house_number)
+
+def _existing_location_id(db: Session, key, locking: bool = False):
+    city, street, house_number = key
+    query = db.query(models.Location.id).filter(
+        models.Location.city == city,
+        models.Location.street == street,
+        models.Location.house_number == house_number
     )
-    db.add(db_location)
-    db.commit()
-    db.refresh(db_location)
-    return db_location
+    if locking:
+        # Блокуюче читання бачить рядки, закомічені після початку транзакції (REPEATABLE READ у MySQL)
+        query = query.with_for_update(read=True)
+    return query.scalar()
+
+def get_existing_location(db: Session, location: schemas.LocationCreate, locking: bool = False):
+    return _existing_location_id(db, location_key(location), locking)
+
+def get_or_create_location(db: Session, location: schemas.LocationCreate):
+    """
+    Ідентифікатор локації з такою адресою; створює її, якщо немає. Не комітить.
+    Гонку двох одночасних вставок розв'язує унікальний індекс: програвша транзакція
+    відкочує savepoint і читає рядок переможця.
+    """
+    key = location_key(location)
+    location_id = location_cache.get(key)
+    if location_id is None:
+        location_id = get_existing_location(db, location)
+    if location_id is not None:
+        location_cache.set(key, location_id)
+        return location_id
+
+    # Нову локацію не кешуємо до коміту: якщо транзакцію відкотять, id буде недійсним
+    try:
+        with db.begin_nested():
+            db_location = models.Location(city=location.city, street=location.street, house_number=location.house_number)
+            db.add(db_location)
+        return db_location.id
+    except IntegrityError:
+        return get_existing_location(db, location, locking=True)
 
-def get_existing_location(db: Session, location: schemas.LocationCreate):
-    return db.query(models.Location).filter(
-        models.Location.city == location.city,
-        models.Location.street == location.street,
-        models.Location.house_number == location.house_number
-    ).first()
- 
 
 def get_location_by_id(db: Session, location_id: int):
     return db.query(models.Location).filter(models.Location.id == location_id).first()
 
+def _batches(items, size=BULK_INSERT_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _location_ids(db: Session, keys, locking: bool = False):
+    """
+    Ідентифікатори наявних локацій для ключів (city, street, house_number).
+    Результат завжди за ключами з keys, навіть якщо БД зберігає адресу в іншому написанні.
+    """
+    found = {}
+    for batch in _batches(keys):
+        requested = set(batch)
+        query = db.query(
+            models.Location.id, models.Location.city, models.Location.street, models.Location.house_number
+        ).filter(
+            tuple_(models.Location.city, models.Location.street, models.Location.house_number).in_(batch)
+        )
+        if locking:
+            query = query.with_for_update(read=True)
+        other_spelling = False
+        for row in query:
+            key = (row.city, row.street, row.house_number)
+            if key in requested:
+                found[key] = row.id
+            else:
+                other_spelling = True
+
+        if other_spelling:
+            # Колація MySQL за замовчуванням не розрізняє регістр, наголоси та кінцеві пробіли, тож
+            # рядок "Kyiv" відповідає і ключу "kyiv". Які саме ключі йому відповідають, визначає лише БД,
+            # тому ключі без точного збігу дошукуємо по одному тим самим порівнянням
+            for key in batch:
+                if key not in found:
+                    location_id = _existing_location_id(db, key, locking)
+                    if location_id is not None:
+                        found[key] = location_id
+    return found
+
+def get_or_create_locations(db: Session, keys):
+    """
+    Повертає словник (city, street, house_number) -> location_id,
+    вставляючи відсутні локації одним executemany. Не комітить.
+    """
+    keys = list(dict.fromkeys(keys))
+    found = {key: location_cache.get(key) for key in keys}
+    found = {key: location_id for key, location_id in found.items() if location_id is not None}
+    found.update(_location_ids(db, [key for key in keys if key not in found]))
+    for key in keys:
+        if key in found:
+            location_cache.set(key, found[key])
+
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Адреси, які встигла вставити паралельна транзакція, пропускаються унікальним індексом
+        statement = insert(models.Location).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+        for batch in _batches(missing):
+            db.execute(statement, [
+                {"city": city, "street": street, "house_number": house_number}
+                for city, street, house_number in batch
+            ])
+        found.update(_location_ids(db, missing, locking=True))
+    return found
+
+def bulk_create_apartments(db: Session, apartments, owner: models.User):
+    """
+    Створює багато оголошень одного власника в одній транзакції:
+    локації та оголошення вставляються пакетами через executemany.
+    Повертає кількість створених оголошень.
+    """
+    if not apartments:
+        return 0
+
+    status = 'approved' if owner.is_admin else 'pending'
+    location_ids = get_or_create_locations(db, [
+        location_key(a.location) for a in apartments
+    ])
+
+    new_owner = MATERIALIZED_STATS and not _has_apartments(db, owner.id)
+    rows = [
+        {
+            "title": a.title,
+            "description": a.description,
+            "price": a.price,
+            "owner_id": owner.id,
+            "location_id": location_ids[location_key(a.location)],
+            "status": status,
+        }
+        for a in apartments
+    ]
+    for batch in _batches(rows):
+        db.execute(insert(models.Apartment), batch)
+
+    _bump_stats(
+        db,
+        total_apartments=len(rows),
+        price_total=sum(int(a.price) for a in apartments),
+        total_owners=int(new_owner),
+        **{_STATUS_COUNTERS[status]: len(rows)}
+    )
+    db.commit()
+    # id вставлених рядків невідомі, знімки дочитають їх як нові
+    _apartments_changed()
+    return len(rows)
+
 # Admin functions
 def get_all_users(db: Session):
     return db.query(models.User).all()
@@ -101,43 +263,196 @@ def get_all_users(db: Session):
 def update_user_status(db: Session, user_id: int, is_active: bool):
     user = get_user_by_id(db, user_id)
     if user:
+        if bool(user.is_active) != is_active:
+            _bump_stats(db, active_users=1 if is_active else -1)
         user.is_active = is_active
         db.commit()
+        # Заблокований користувач не повинен далі авторизуватись із закешованими даними
+        user_cache.invalidate(user.email)
+        # Оголошення заблокованого власника не рекомендуються, а розблокованого - повертаються
+        owned = db.query(models.Apartment.id).filter(models.Apartment.owner_id == user_id).all()
+        _apartments_changed(*(row.id for row in owned))
     return user
 
+def get_users_page(db: Session, limit: int, cursor: str = None, q: str = None):
+    """Сторінка користувачів для адмін-панелі за id; q шукає за початком email (через індекс)."""
+    query = db.query(models.User)
+    if q:
+        query = query.filter(models.User.email.startswith(q, autoescape=True))
+    return pagination.paginate(query, models.User.id, models.User.id, limit, cursor, descending=False)
+
+def get_pending_apartments_page(db: Session, limit: int, cursor: str = None, q: str = None):
+    """
+    Черга модерації сторінками, від найстаріших оголошень.
+    Власник вантажиться тим самим запитом; q шукає підрядок у назві.
+    """
+    query = (
+        db.query(models.Apartment)
+        .options(joinedload(models.Apartment.owner))
+        .filter(models.Apartment.status == 'pending')
+    )
+    if q:
+        query = query.filter(models.Apartment.title.contains(q, autoescape=True))
+    return pagination.paginate(query, models.Apartment.created_at, models.Apartment.id, limit, cursor, descending=False)
+
 def get_pending_apartments(db: Session):
-    return db.query(models.Apartment).filter(models.Apartment.status == 'pending').all()
+    # Шаблон адмін-панелі показує власника кожного оголошення
+    return (
+        db.query(models.Apartment)
+        .options(joinedload(models.Apartment.owner))
+        .filter(models.Apartment.status == 'pending')
+        .all()
+    )
 
 def moderate_apartment(db: Session, apartment_id: int, status: str, moderator_id: int):
     apartment = get_apartment(db, apartment_id)
     if apartment:
+        if apartment.status != status:
+            _bump_stats(db, **{_STATUS_COUNTERS[apartment.status]: -1, _STATUS_COUNTERS[status]: 1})
         apartment.status = status
         apartment.moderated_by = moderator_id
         apartment.moderated_at = datetime.utcnow()
         db.commit()
+        invalidate_card(apartment_id)
+        _apartments_changed(apartment_id)
     return apartment
 
-def get_system_stats(db: Session):
-    total_users = db.query(func.count(models.User.id)).scalar()
-    active_users = db.query(func.count(models.User.id)).filter(models.User.is_active == True).scalar()
-    total_apartments = db.query(func.count(models.Apartment.id)).scalar()
-    pending_apartments = db.query(func.count(models.Apartment.id)).filter(models.Apartment.status == 'pending').scalar()
-    approved_apartments = db.query(func.count(models.Apartment.id)).filter(models.Apartment.status == 'approved').scalar()
-    rejected_apartments = db.query(func.count(models.Apartment.id)).filter(models.Apartment.status == 'rejected').scalar()
-    average_price = db.query(func.avg(models.Apartment.price)).scalar() or 0
-    total_owners = db.query(func.count(func.distinct(models.Apartment.owner_id))).scalar()
+def bulk_moderate_apartments(db: Session, status: str, moderator_id: int, ids=None, filter: schemas.ModerationFilter = None):
+    """
+    Встановлює статус усім вибраним оголошенням (за списком ids або за фільтром) в одній транзакції.
+    Повертає словник для schemas.BulkModerationResult.
+    """
+    values = {"status": status, "moderated_by": moderator_id, "moderated_at": datetime.utcnow()}
+    if ids is None:
+        return _moderate_by_filter(db, filter, values)
 
+    # Рядки блокуються до commit, тож паралельна модерація не змінить статус між читанням і UPDATE
+    # і лічильники рахуються від справжніх старих статусів
+    rows = db.query(models.Apartment.id, models.Apartment.status).filter(
+        models.Apartment.id.in_(ids)
+    ).with_for_update().all()
+
+    matched = [row.id for row in rows]
+    if matched:
+        # Один UPDATE: схема обмежує список BULK_MODERATION_MAX_IDS, тож IN (...) не розростається
+        db.query(models.Apartment).filter(models.Apartment.id.in_(matched)).update(values, synchronize_session=False)
+
+    changed = [row for row in rows if row.status != status]
+    deltas = {_STATUS_COUNTERS[status]: len(changed)}
+    for row in changed:
+        counter = _STATUS_COUNTERS[row.status]
+        deltas[counter] = deltas.get(counter, 0) - 1
+    _bump_stats(db, **deltas)
+    db.commit()
+
+    for apartment_id in matched:
+        invalidate_card(apartment_id)
+    _apartments_changed(*matched)
+
+    found = set(matched)
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_apartments": total_apartments,
-        "pending_apartments": pending_apartments,
-        "approved_apartments": approved_apartments,
-        "rejected_apartments": rejected_apartments,
-        "average_price": float(average_price),
-        "total_owners": total_owners
+        "status": status,
+        "matched": len(matched),
+        "changed": len(changed),
+        "not_found": [apartment_id for apartment_id in dict.fromkeys(ids) if apartment_id not in found],
     }
 
+def _moderate_by_filter(db: Session, filter: schemas.ModerationFilter, values: dict):
+    """
+    Модерація за фільтром одним UPDATE ... WHERE без читання id.
+    Фільтр задає старий статус, тож кількість оновлених рядків і є зміною лічильників.
+    """
+    query = db.query(models.Apartment).filter(models.Apartment.status == filter.status)
+    if filter.owner_id is not None:
+        query = query.filter(models.Apartment.owner_id == filter.owner_id)
+    if filter.city:
+        query = query.filter(models.Apartment.location_id.in_(
+            select(models.Location.id).where(models.Location.city == filter.city)
+        ))
+    matched = query.update(values, synchronize_session=False)
+
+    changed = matched if filter.status != values["status"] else 0
+    _bump_stats(db, **{_STATUS_COUNTERS[values["status"]]: changed, _STATUS_COUNTERS[filter.status]: -changed})
+    db.commit()
+
+    # Кеш карток перевіряє moderated_at, а знімкам простіше перечитатись, ніж отримати довгий список id
+    _all_apartments_changed()
+    return {"status": values["status"], "matched": matched, "changed": changed, "not_found": []}
+
+# Назви лічильників system_stats для кожного статусу оголошення
+_STATUS_COUNTERS = {
+    'pending': 'pending_apartments',
+    'approved': 'approved_apartments',
+    'rejected': 'rejected_apartments',
+}
+
+def _apartments_changed(*apartment_ids: int):
+    """Позначає зміни оголошень для знімків у пам'яті воркера: аналітики цін і схожих оголошень."""
+    price_snapshot.mark_changed(*apartment_ids)
+    similar_index.mark_changed(*apartment_ids)
+
+def _all_apartments_changed():
+    """Змінено невідомо які оголошення (модерація за фільтром): знімки перечитаються повністю."""
+    price_snapshot.invalidate()
+    similar_index.invalidate()
+
+def _has_apartments(db: Session, owner_id: int):
+    return db.query(models.Apartment.id).filter(models.Apartment.owner_id == owner_id).first() is not None
+
+def _bump_stats(db: Session, **deltas):
+    """
+    Змінює матеріалізовані лічильники на задані значення.
+    Виконується в поточній транзакції, тому фіксується разом зі зміною даних.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not MATERIALIZED_STATS or not deltas:
+        return
+    db.query(models.SystemStats).filter(models.SystemStats.id == 1).update(
+        {getattr(models.SystemStats, name): getattr(models.SystemStats, name) + delta for name, delta in deltas.items()},
+        synchronize_session=False
+    )
+
+def _compute_system_stats(db: Session):
+    """Вся статистика одним агрегуючим запитом."""
+    users = db.query(
+        func.count(models.User.id).label("total_users"),
+        func.coalesce(func.sum(case((models.User.is_active == True, 1), else_=0)), 0).label("active_users"),
+    ).subquery()
+    apartments = db.query(
+        func.count(models.Apartment.id).label("total_apartments"),
+        func.coalesce(func.sum(case((models.Apartment.status == 'pending', 1), else_=0)), 0).label("pending_apartments"),
+        func.coalesce(func.sum(case((models.Apartment.status == 'approved', 1), else_=0)), 0).label("approved_apartments"),
+        func.coalesce(func.sum(case((models.Apartment.status == 'rejected', 1), else_=0)), 0).label("rejected_apartments"),
+        func.coalesce(func.sum(models.Apartment.price), 0).label("price_total"),
+        func.count(func.distinct(models.Apartment.owner_id)).label("total_owners"),
+    ).subquery()
+
+    # Обидва підзапити повертають по одному рядку, тому з'єднуємо їх без умови
+    return db.query(users, apartments).select_from(users).join(apartments, true()).one()._asdict()
+
+def rebuild_system_stats(db: Session):
+    """Перераховує матеріалізовані лічильники з нуля."""
+    values = _compute_system_stats(db)
+    row = db.get(models.SystemStats, 1)
+    if row is None:
+        row = models.SystemStats(id=1)
+        db.add(row)
+    for name, value in values.items():
+        setattr(row, name, int(value))
+    db.commit()
+    return row
+
+def get_system_stats(db: Session):
+    if MATERIALIZED_STATS:
+        row = db.get(models.SystemStats, 1) or rebuild_system_stats(db)
+        values = {column.key: getattr(row, column.key) for column in models.SystemStats.__table__.columns if column.key != "id"}
+    else:
+        values = _compute_system_stats(db)
+
+    price_total = values.pop("price_total")
+    values["average_price"] = float(price_total) / values["total_apartments"] if values["total_apartments"] else 0.0
+    return values
+
 def update_user_last_login(db: Session, user_id: int):
     user = get_user_by_id(db, user_id)
     if user:
@@ -145,8 +460,24 @@ def update_user_last_login(db: Session, user_id: int):
         db.commit()
     return user
 
-def get_apartments(db: Session, skip: int = 0, limit: int = 100, current_user: models.User = None):
-    query = db.query(models.Apartment)
+def update_user_password(db: Session, user_id: int, password_hash: str):
+    # Заміна пароля у відкритому вигляді чи застарілого хешу після успішного входу
+    db.query(models.User).filter(models.User.id == user_id).update({"password": password_hash})
+    db.commit()
+
+# Колонки, з яких складається версія оголошення для ETag
+_VERSION_COLUMNS = (
+    models.Apartment.id,
+    models.Apartment.status,
+    models.Apartment.created_at,
+    models.Apartment.updated_at,
+    models.Apartment.moderated_at,
+)
+
+def _visible_apartments(db: Session, current_user: models.User = None, query=None):
+    if query is None:
+        # Картки оголошень показують адресу, тому локації підтягуємо тим самим запитом
+        query = db.query(models.Apartment).options(joinedload(models.Apartment.location))
     
     if not current_user or not current_user.is_admin:
         # If user is not admin, show only approved apartments
@@ -155,6 +486,119 @@ def get_apartments(db: Session, skip: int = 0, limit: int = 100, current_user: m
         # If not admin, exclude apartments of blocked users
         query = query.join(models.User, models.User.id == models.Apartment.owner_id).filter(models.User.is_active == True)
     
-    return query.offset(skip).limit(limit).all()
+    return query
+
+def get_apartments(db: Session, skip: int = 0, limit: int = 100, current_user: models.User = None):
+    return _visible_apartments(db, current_user).offset(skip).limit(limit).all()
+
+def get_apartments_page(db: Session, limit: int, cursor: str = None, current_user: models.User = None):
+    """Сторінка оголошень для головної, від новіших до старіших, з keyset-курсорами."""
+    return pagination.paginate(
+        _visible_apartments(db, current_user),
+        models.Apartment.created_at, models.Apartment.id,
+        limit, cursor
+    )
+
+def get_apartments_page_versions(db: Session, limit: int, cursor: str = None, current_user: models.User = None):
+    """Та сама сторінка, що й get_apartments_page, але лише з колонками версії — для умовних GET."""
+    return pagination.paginate(
+        _visible_apartments(db, current_user, db.query(*_VERSION_COLUMNS)),
+        models.Apartment.created_at, models.Apartment.id,
+        limit, cursor
+    )
+
+def get_apartments_by_ids(db: Session, ids, current_user: models.User = None):
+    """Доступні оголошення з переліку ids одним запитом, у порядку ids (для схожих оголошень)."""
+    if not ids:
+        return []
+    apartments = _visible_apartments(db, current_user).filter(models.Apartment.id.in_(ids)).all()
+    by_id = {apartment.id: apartment for apartment in apartments}
+    return [by_id[apartment_id] for apartment_id in ids if apartment_id in by_id]
+
+def get_user_apartments_page(db: Session, user_id: int, limit: int, cursor: str = None):
+    query = (
+        db.query(models.Apartment)
+        .options(joinedload(models.Apartment.location))
+        .filter(models.Apartment.owner_id == user_id)
+    )
+    return pagination.paginate(query, models.Apartment.created_at, models.Apartment.id, limit, cursor)
+
+def search_apartments(
+    db: Session,
+    limit: int,
+    cursor: str = None,
+    city: str = None,
+    min_price: int = None,
+    max_price: int = None,
+    status: str = None,
+    sort: str = "recent",
+    current_user: models.User = None
+):
+    """
+    Пошук оголошень за містом, діапазоном цін і статусом.
+    Сортування за ціною (від дешевших) або за датою створення (від новіших).
+    """
+    query = (
+        db.query(models.Apartment)
+        .join(models.Location, models.Location.id == models.Apartment.location_id)
+        .options(contains_eager(models.Apartment.location))
+    )
+
+    if not current_user or not current_user.is_admin:
+        # Звичайні користувачі бачать лише одобрені оголошення активних власників
+        status = 'approved'
+        query = query.join(models.User, models.User.id == models.Apartment.owner_id).filter(models.User.is_active == True)
+
+    if status:
+        query = query.filter(models.Apartment.status == status)
+    if city:
+        query = query.filter(models.Location.city == city)
+    if min_price is not None:
+        query = query.filter(models.Apartment.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Apartment.price <= max_price)
+
+    if sort == "price":
+        return pagination.paginate(query, models.Apartment.price, models.Apartment.id, limit, cursor, descending=False)
+    return pagination.paginate(query, models.Apartment.created_at, models.Apartment.id, limit, cursor)
+
+FULLTEXT_MAX_TERMS = 10
+
+def _fulltext_terms(q: str):
+    # Лише слова: оператори MATCH обох БД у запиті користувача не інтерпретуються
+    return re.findall(r"\w+", q)[:FULLTEXT_MAX_TERMS]
+
+def fulltext_search_apartments(db: Session, q: str, limit: int, current_user: models.User = None):
+    """
+    Повнотекстовий пошук за назвою та описом, від найрелевантніших.
+    MySQL: FULLTEXT-індекс (MATCH ... AGAINST), SQLite: FTS5 з ранжуванням bm25.
+    Оголошення має містити всі слова запиту. Ранжуються лише id видимих оголошень,
+    а повні рядки з локаціями завантажуються для limit найкращих.
+    """
+    terms = _fulltext_terms(q)
+    if not terms:
+        return []
 
+    # Сортування поширеного слова проходить десятки тисяч рядків; з самими id воно не тягне
+    # через тимчасове B-дерево описи та адреси
+    query = _visible_apartments(db, current_user, db.query(models.Apartment.id))
+    if db.get_bind().dialect.name == "mysql":
+        score = match(
+            models.Apartment.title, models.Apartment.description, against=" ".join("+" + term for term in terms)
+        ).in_boolean_mode()
+        query = query.filter(score > 0).order_by(score.desc(), models.Apartment.id.desc())
+    else:
+        expression = " ".join('"%s"' % term for term in terms)
+        # bm25 ранжує всі видимі збіги: обмеження кандидатів до фільтра видимості втрачало
+        # одобрені оголошення за свіжими неперевіреними, а за новизною - відкидало релевантніші старі
+        ranked = (
+            select(literal_column("rowid").label("id"), literal_column("bm25(apartments_fts)").label("score"))
+            .select_from(text("apartments_fts"))
+            .where(text("apartments_fts MATCH :expression").bindparams(expression=expression))
+            .subquery()
+        )
+        # bm25 повертає менші значення для релевантніших документів
+        query = query.join(ranked, ranked.c.id == models.Apartment.id).order_by(ranked.c.score, models.Apartment.id.desc())
 
+    ids = [row.id for row in query.limit(limit)]
+    return get_apartments_by_ids(db, ids, current_user)
@@ -1,14 +1,77 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+import random
+from contextvars import ContextVar
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .config import (
+    DATABASE_URL, ASYNC_DATABASE_URL, DATABASE_REPLICA_URLS, ASYNC_DATABASE_REPLICA_URLS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+from .pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+from .instrumentation import instrument_engine
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def engine_options(url: str, poolclass):
+    """Налаштування пулу з конфігурації. SQLite лишається зі своїм типовим пулом."""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
 
-Base = declarative_base()
-print("Database engine created")
-Base.metadata.create_all(bind=engine)
+# Чи можна поточному запиту читати з реплік. Встановлює ReplicaRoutingMiddleware
+# для GET/HEAD без позначки нещодавнього запису; за замовчуванням усе йде на primary
+read_from_replica: ContextVar[bool] = ContextVar("read_from_replica", default=False)
+
+class RoutingSession(Session):
+    """
+    Сесія, що надсилає читання на репліку, а запис - на primary (bind сесії).
+    Репліки передаються через info["replicas"]. Після першого запису в сесії
+    всі наступні запити теж ідуть на primary, щоб сесія бачила власні зміни.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replicas = self.info.get("replicas")
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+        if not replicas or self.info.get("wrote") or not read_from_replica.get():
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+        # Одна репліка на всю сесію, щоб усі її читання бачили той самий стан
+        if "replica" not in self.info:
+            self.info["replica"] = random.choice(replicas)
+        return self.info["replica"]
+
+def _create_engine(url: str):
+    created = create_engine(url, **engine_options(url, InstrumentedQueuePool))
+    instrument_engine(created)
+    return created
+
+def _create_async_engine(url: str):
+    created = create_async_engine(url, **engine_options(url, InstrumentedAsyncQueuePool))
+    instrument_engine(created.sync_engine)
+    return created
+
+engine = _create_engine(DATABASE_URL)
+replica_engines = [_create_engine(url) for url in DATABASE_REPLICA_URLS]
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine,
+    class_=RoutingSession, info={"replicas": replica_engines}
+)
+
+# Асинхронний engine для async-маршрутів, щоб звернення до БД не блокували цикл подій.
+# expire_on_commit=False, бо ліниве завантаження атрибутів поза сесією в async неможливе
+async_engine = _create_async_engine(ASYNC_DATABASE_URL)
+async_replica_engines = [_create_async_engine(url) for url in ASYNC_DATABASE_REPLICA_URLS]
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False,
+    sync_session_class=RoutingSession, info={"replicas": [e.sync_engine for e in async_replica_engines]}
+)
 
 def get_db():
     db = SessionLocal()
@@ -17,54 +80,6 @@ def get_db():
     finally:
         db.close()
 
-# Функція для оновлення структури бази даних
-def update_database():
-    
-    # Оновлюємо таблицю users
-    with engine.connect() as connection:
-        # Перевіряємо чи існує колонка is_active
-        result = connection.execute(text("SHOW COLUMNS FROM users LIKE 'is_active'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE users ADD COLUMN is_active BOOLEAN DEFAULT TRUE"))
-        
-        # Перевіряємо чи існує колонка created_at
-        result = connection.execute(text("SHOW COLUMNS FROM users LIKE 'created_at'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE users ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"))
-        
-        # Перевіряємо чи існує колонка last_login
-        result = connection.execute(text("SHOW COLUMNS FROM users LIKE 'last_login'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE users ADD COLUMN last_login DATETIME"))
-        
-        # Оновлюємо таблицю apartments
-        # Перевіряємо чи існує колонка status
-        result = connection.execute(text("SHOW COLUMNS FROM apartments LIKE 'status'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE apartments ADD COLUMN status VARCHAR(20) DEFAULT 'pending'"))
-        
-        # Перевіряємо чи існує колонка created_at
-        result = connection.execute(text("SHOW COLUMNS FROM apartments LIKE 'created_at'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE apartments ADD COLUMN created_at DATETIME DEFAULT CURRENT_TIMESTAMP"))
-        
-        # Перевіряємо чи існує колонка updated_at
-        result = connection.execute(text("SHOW COLUMNS FROM apartments LIKE 'updated_at'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE apartments ADD COLUMN updated_at DATETIME ON UPDATE CURRENT_TIMESTAMP"))
-        
-        # Перевіряємо чи існує колонка moderated_by
-        result = connection.execute(text("SHOW COLUMNS FROM apartments LIKE 'moderated_by'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE apartments ADD COLUMN moderated_by INTEGER"))
-        
-        # Перевіряємо чи існує колонка moderated_at
-        result = connection.execute(text("SHOW COLUMNS FROM apartments LIKE 'moderated_at'"))
-        if not result.fetchone():
-            connection.execute(text("ALTER TABLE apartments ADD COLUMN moderated_at DATETIME"))
-        
-        connection.commit()
-
-# Викликаємо оновлення бази даних при запуску
-update_database()
-
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
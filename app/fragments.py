@@ -0,0 +1,42 @@
+from markupsafe import Markup
+from .cache import TTLCache
+from .config import FRAGMENT_CACHE_SIZE
+
+# Відрендерені картки оголошень: apartment_id -> (версія, HTML)
+card_cache = TTLCache(FRAGMENT_CACHE_SIZE)
+
+
+def card_version(apartment):
+    """Версія картки: змінюється при редагуванні та модерації оголошення."""
+    return (apartment.updated_at, apartment.moderated_at, apartment.status)
+
+
+def iter_apartment_cards(templates, request, apartments):
+    """
+    HTML карток для списку оголошень по одній, у міру обходу.
+    Шаблон apartment_item.html рендериться лише для карток, яких немає в кеші
+    або чия версія змінилась; решта береться з кешу готовими рядками.
+    У потоковій сторінці картки рендеряться під час віддачі, а не до першого байта.
+    """
+    template = None
+    for apartment in apartments:
+        version = card_version(apartment)
+        cached = card_cache.get(apartment.id)
+        if cached is not None and cached[0] == version:
+            yield cached[1]
+            continue
+
+        if template is None:
+            template = templates.get_template("apartment_item.html")
+        html = Markup(template.render({"request": request, "apartment": apartment}))
+        card_cache.set(apartment.id, (version, html))
+        yield html
+
+
+def render_apartment_cards(templates, request, apartments):
+    """Повертає HTML карток для списку оголошень (див. iter_apartment_cards)."""
+    return list(iter_apartment_cards(templates, request, apartments))
+
+
+def invalidate_card(apartment_id: int):
+    card_cache.invalidate(apartment_id)
@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Лічильник SQL-запитів, виконаних через engine."""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append((statement, parameters))
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Рахує запити, які виконуються через engine всередині блоку with.
+    Зручно для перевірки, що кількість запитів не росте разом з розміром сторінки.
+    """
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._on_execute)
+
+
+class RequestQueryStats:
+    """Кількість і сумарний час SQL-запитів одного HTTP-запиту."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+
+    @property
+    def route(self):
+        # Після маршрутизації FastAPI кладе в scope знайдений маршрут, тож логуємо шаблон шляху
+        route = self.scope.get("route")
+        return f'{self.scope["method"]} {getattr(route, "path", self.scope["path"])}'
+
+
+# Об'єкт статистики поточного запиту. Контекст копіюється в потоки threadpool
+# та в greenlet-и AsyncSession, тож слухачі engine бачать той самий об'єкт
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Час старту зберігаємо в контексті виконання: якщо запит впаде, він просто зникне разом з ним
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query %.1f ms [%s]: %s; parameters: %r",
+            elapsed * 1000, stats.route if stats else "-", statement, parameters
+        )
+
+
+def instrument_engine(engine):
+    """Підключає облік часу запитів і журнал повільних запитів до engine (для async - до sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware, що рахує SQL-запити кожного HTTP-запиту і додає заголовок
+    Server-Timing: db;dur=<мс>;desc="<N> queries". Запити, виконані після початку
+    стрімінгу відповіді, в заголовок не потрапляють.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope)
+        token = _request_stats.set(stats)
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
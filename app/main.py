@@ -1,18 +1,27 @@
-from fastapi import FastAPI, Depends, Request, HTTPException, Form, status
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, Request, HTTPException, Form, Query, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from . import  models, schemas, crud, auth
-from .database import get_db
-from fastapi.templating import Jinja2Templates
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import  models, schemas, crud, async_crud, auth, api, migrations, conditional, security, write_behind, templating
+from .config import PAGE_SIZE, MAX_PAGE_SIZE, AUTO_MIGRATE, SIMILAR_APARTMENTS
+from .database import get_db, get_async_db, engine, async_engine, replica_engines, async_replica_engines, SessionLocal
+from .pool import pool_status
+from .pagination import InvalidCursor
+from .cache import user_cache, location_cache
+from .fragments import card_cache, iter_apartment_cards, render_apartment_cards
+from .analytics import price_snapshot
+from .recommendations import similar_index
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi import HTTPException, Form, Depends
 from sqlalchemy.orm import Session
 import logging
-from .middleware import CurrentUserMiddleware
-from sqlalchemy.sql import func
+from .middleware import CurrentUserMiddleware, ReplicaRoutingMiddleware, current_user_context
+from .instrumentation import QueryStatsMiddleware
 
 
 # Налаштування логування
@@ -21,7 +30,22 @@ logger = logging.getLogger(__name__)  # Створюємо логер для ц
 
 from fastapi import FastAPI
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Схема перевіряється одним запитом; міграції — окремим кроком (python -m app.migrations)
+    if AUTO_MIGRATE:
+        migrations.migrate(engine)
+    else:
+        migrations.check_schema(engine)
+    templating.warm_up(templates)
+    write_behind.buffer.start(async_engine)
+    similar_index.start(SessionLocal)
+    yield
+    await similar_index.stop()
+    await write_behind.buffer.stop(async_engine)
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Apartment Rental API",
     description="API for managing apartment rentals, including user registration, authentication, apartment management, and administration.",
     version="1.0.0",
@@ -33,25 +57,52 @@ app = FastAPI(
 
 # Додаємо middleware
 app.add_middleware(CurrentUserMiddleware)
+# Маршрутизація на репліки має діяти вже під час визначення користувача, тож вона зовніша
+app.add_middleware(ReplicaRoutingMiddleware)
+# Останній доданий middleware зовнішній, тож у Server-Timing враховано й запит користувача
+app.add_middleware(QueryStatsMiddleware)
 
-# Налаштування Jinja2 для шаблонів
-templates = Jinja2Templates(directory="app/templates")
+# Налаштування Jinja2 для шаблонів (з кешем скомпільованих шаблонів на диску)
+templates = templating.create_templates("app/templates", context_processors=[current_user_context])
 
 # Підключення статичних файлів (CSS, JS)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+# JSON API
+app.include_router(api.router)
+
 @app.get("/")
 async def home(
     request: Request,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user_from_cookie)
 ):
-    apartments = crud.get_apartments(db, current_user=current_user)
-    return templates.TemplateResponse("home.html", {
+    try:
+        if conditional.has_validators(request):
+            # Клієнт має копію сторінки: спершу дешевий запит лише версій оголошень
+            versions = await async_crud.get_apartments_page_versions(db, limit, cursor, current_user=current_user)
+            etag, last_modified = conditional.validators(current_user, versions.items, limit, versions.next_cursor, versions.prev_cursor)
+            if conditional.is_not_modified(request, etag, last_modified):
+                return conditional.not_modified(etag, last_modified)
+
+        page = await async_crud.get_apartments_page(db, limit, cursor, current_user=current_user)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    etag, last_modified = conditional.validators(current_user, page.items, limit, page.next_cursor, page.prev_cursor)
+    response = templating.page_response(templates, "home.html", {
         "request": request,
-        "apartments": apartments,
+        "apartments": page.items,
+        # Картки рендеряться під час обходу шаблону, тож у потоковій сторінці перший байт їх не чекає
+        "cards": iter_apartment_cards(templates, request, page.items),
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+        "limit": limit,
         "current_user": current_user
     })
+    return conditional.set_validators(response, etag, last_modified)
 
 @app.get("/register/")
 def show_register_page(request: Request, current_user: models.User = Depends(auth.get_current_user_from_cookie)):
@@ -61,7 +112,7 @@ def show_register_page(request: Request, current_user: models.User = Depends(aut
     })
 
 @app.post("/register/")
-def register_user(
+async def register_user(
     request: Request,  
     email: str = Form(...),
     password: str = Form(...),
@@ -69,11 +120,11 @@ def register_user(
     first_name: str = Form(...),
     last_name: str = Form(...),
     phone: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user_from_cookie)):
 
     error = None
-    if crud.get_user(db, email=email):
+    if await async_crud.get_user(db, email=email):
         error = "Користувач із таким email вже існує"
     elif password != confirm_password:
         error = "Паролі не співпадають"
@@ -89,13 +140,14 @@ def register_user(
             "current_user": current_user
         })
 
-    crud.create_user(db, schemas.UserCreate(
+    user = schemas.UserCreate(
         email=email, 
         password=password, 
         first_name=first_name, 
         last_name=last_name, 
         phone=phone
-    ))
+    )
+    await async_crud.create_user(db, user, await security.hash_password(password))
 
     return RedirectResponse(url="/", status_code=302)
 
@@ -107,16 +159,18 @@ def show_login_page(request: Request, current_user: models.User = Depends(auth.g
     })
 
 @app.post("/login/")
-def login(
+async def login(
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
     current_user: models.User = Depends(auth.get_current_user_from_cookie)
 ):
-    user = crud.get_user(db, email)
-    
-    if not user or not user.password == password:
+    user = await async_crud.get_user(db, email)
+    # bcrypt виконується в окремому пулі потоків, цикл подій тим часом обслуговує інші запити
+    valid, new_hash = await security.verify_password(password, user.password if user else None)
+
+    if not user or not valid:
         error_message = "Невірні облікові дані. Спробуйте ще раз."
         return templates.TemplateResponse("login.html", {
             "request": request, 
@@ -134,7 +188,10 @@ def login(
             "current_user": current_user
         })
 
-    crud.update_user_last_login(db, user.id)
+    if new_hash:
+        await async_crud.update_user_password(db, user.id, new_hash)
+    # Час входу записується пакетом у фоні, відповідь не чекає на UPDATE
+    write_behind.buffer.record_login(user.id)
     access_token = auth.create_access_token(data={"sub": user.email})
     response = RedirectResponse(url="/", status_code=302)  
     response.set_cookie(key="access_token", value=access_token, httponly=True) 
@@ -144,16 +201,25 @@ def login(
 @app.get("/profile/")
 def show_profile_page(
         request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
         db: Session = Depends(get_db),
         current_user: models.User = Depends(auth.get_current_user)  
     ):
     
-    apartments = crud.get_user_apartments(db, user_id=current_user.id)  
+    try:
+        page = crud.get_user_apartments_page(db, current_user.id, limit, cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
     return templates.TemplateResponse("profile.html", {
         "request": request,
         "user": current_user,
-        "apartments": apartments,
+        "apartments": page.items,
+        "cards": render_apartment_cards(templates, request, page.items),
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+        "limit": limit,
         "current_user": current_user
     })
 
@@ -178,25 +244,44 @@ def get_add_edit_apartment_page(
 @app.get("/apartments/{apartment_id}")
 async def show_apartment_page(request: Request, 
                         apartment_id: int, 
-                        db: Session = Depends(get_db),
+                        db: AsyncSession = Depends(get_async_db),
                         current_user: models.User = Depends(auth.get_current_user_from_cookie)
                         ):
-    apartment = crud.get_apartment(db, apartment_id)
+    apartment = await async_crud.get_apartment(db, apartment_id)
 
     if not apartment:
         raise HTTPException(status_code=404, detail="Apartment not found")
 
-    owner = crud.get_user_by_id(db, apartment.owner_id)
+    # Перегляди рахуються в буфері й записуються пакетом, а не UPDATE на кожен показ
+    write_behind.buffer.record_view(apartment_id)
+
+    owner = apartment.owner
 
     is_owner = current_user is not None and current_user.id == apartment.owner_id
 
-    return templates.TemplateResponse("apartment.html", {
+    # Схожі оголошення визначає індекс у пам'яті, а з БД вони вибираються одним запитом.
+    # Індекс будується в кожному воркері окремо, тож у ETag ідуть самі рекомендовані
+    # оголошення з їх версіями, а не локальний номер версії індексу
+    similar = await async_crud.get_apartments_by_ids(
+        db, similar_index.similar(apartment, SIMILAR_APARTMENTS), current_user=current_user
+    )
+    etag, last_modified = conditional.validators(
+        current_user, [apartment, *similar], "similar:" + ",".join(str(a.id) for a in similar)
+    )
+    # Власник бачить лічильник переглядів, який змінюється без зміни версії оголошення,
+    # тож для нього сторінка завжди рендериться заново
+    if not is_owner and conditional.is_not_modified(request, etag, last_modified):
+        return conditional.not_modified(etag, last_modified)
+
+    response = templates.TemplateResponse("apartment.html", {
         "request": request,
         "apartment": apartment,
         "owner": owner,
         "is_owner": is_owner,
+        "similar_cards": render_apartment_cards(templates, request, similar),
         "current_user": current_user
     })
+    return conditional.set_validators(response, etag, last_modified)
 
 @app.post("/apartments/")
 def create_apartment(
@@ -276,33 +361,18 @@ def check_admin_access(current_user: models.User):
 @app.get("/admin/")
 async def admin_panel(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     check_admin_access(current_user)  
 
-    # оце може краще в crud винести
-    stats = {
-        "total_users": db.query(models.User).count(),
-        "active_users": db.query(models.User).filter(models.User.is_active == True).count(),
-        "total_apartments": db.query(models.Apartment).count(),
-        "pending_apartments": db.query(models.Apartment).filter(models.Apartment.status == "pending").count(),
-        "approved_apartments": db.query(models.Apartment).filter(models.Apartment.status == "approved").count(),
-        "rejected_apartments": db.query(models.Apartment).filter(models.Apartment.status == "rejected").count(),
-        "average_price": db.query(func.avg(models.Apartment.price)).scalar() or 0,
-        "total_owners": db.query(models.User).filter(models.User.owned_apartments.any()).count()
-    }
-
-    users = db.query(models.User).all()
-
-    # Отримуємо квартири, що очікують модерації
-    pending_apartments = db.query(models.Apartment).filter(models.Apartment.status == "pending").all()
+    stats = await async_crud.get_system_stats(db)
 
-    return templates.TemplateResponse("admin_panel.html", {
+    # Користувачів і чергу модерації сторінка підвантажує сама через /api/admin/...
+    return templating.page_response(templates, "admin_panel.html", {
         "request": request,
-        "users": users,
-        "pending_apartments": pending_apartments,
         "stats": stats,
+        "page_size": PAGE_SIZE,
         "current_user": current_user  
     })
 
@@ -342,8 +412,40 @@ def moderate_apartment(
     crud.moderate_apartment(db, apartment_id, status, current_user.id)
     return RedirectResponse(url="/admin/", status_code=302)
 
+@app.get("/admin/stats/cache")
+def cache_stats(current_user: models.User = Depends(auth.get_current_user)):
+    check_admin_access(current_user)
+    return {
+        "users": user_cache.stats(),
+        "locations": location_cache.stats(),
+        "cards": card_cache.stats(),
+        "prices": price_snapshot.stats(),
+        "similar": similar_index.stats(),
+    }
+
+@app.get("/admin/stats/pool")
+def pool_stats(current_user: models.User = Depends(auth.get_current_user)):
+    check_admin_access(current_user)
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine),
+        "replicas": [pool_status(replica) for replica in replica_engines],
+        "async_replicas": [pool_status(replica) for replica in async_replica_engines],
+        "password_hash": security.stats(),
+    }
+
+@app.get("/admin/stats/write-behind")
+def write_behind_stats(current_user: models.User = Depends(auth.get_current_user)):
+    check_admin_access(current_user)
+    return write_behind.buffer.stats()
+
 @app.exception_handler(HTTPException)
-async def custom_http_exception_handler(request: Request, exc: HTTPException, current_user: models.User = Depends(auth.get_current_user_from_cookie)):
+async def custom_http_exception_handler(request: Request, exc: HTTPException):
+    # JSON API отримує помилки у форматі JSON, а не сторінки чи перенаправлення
+    if request.url.path.startswith("/api/"):
+        return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
+
+    current_user = getattr(request.state, "current_user", None)
     # Якщо помилка 401 (не авторизований), перенаправити на сторінку логіну
     if exc.status_code == 401:
         return RedirectResponse(url="/login")
@@ -367,15 +469,14 @@ async def custom_http_exception_handler(request: Request, exc: HTTPException, cu
         })
     
     # Якщо інша помилка, просто відобразити її в JSON відповіді
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
 
 @app.exception_handler(ValidationError)
-async def validation_exception_handler(request: Request, exc: ValidationError, current_user: models.User = Depends(auth.get_current_user_from_cookie)):
+async def validation_exception_handler(request: Request, exc: ValidationError):
     errors = exc.errors()
     error_messages = [{"field": e['loc'][-1], "message": e['msg']} for e in errors]
 
-    # Повертаємо шаблон з помилками та поточним користувачем
     return JSONResponse(
         status_code=400,
-        content={"detail": error_messages, "current_user": current_user}  
+        content={"detail": error_messages}  
     )
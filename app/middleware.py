@@ -1,26 +1,80 @@
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from . import auth, models
-from .database import SessionLocal
-
-class CurrentUserMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # Отримуємо доступ до шаблонів
-        if hasattr(request.app, 'templates'):
-            templates = request.app.templates
-            
-            # Отримуємо поточного користувача
-            db = SessionLocal()
+import logging
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from . import auth
+from .config import REPLICA_STICKY_SECONDS
+from .database import read_from_replica
+
+logger = logging.getLogger(__name__)
+
+
+class CurrentUserMiddleware:
+    """
+    Pure ASGI middleware, що один раз на запит визначає поточного користувача
+    і зберігає його в request.state.current_user.
+    Залежності з auth та шаблони читають звідти, не звертаючись до БД повторно.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Статичним файлам користувач не потрібен
+        if scope["type"] == "http" and not scope["path"].startswith("/static/"):
+            token = HTTPConnection(scope).cookies.get("access_token")
             try:
-                current_user = await auth.get_current_user_from_cookie(request, db)
-            except:
+                current_user = await auth.resolve_user(token)
+            except SQLAlchemyError:
+                # Як і раніше, недоступна БД не ламає сторінки: запит обробляється як анонімний
+                logger.exception("Failed to resolve current user, treating request as anonymous")
                 current_user = None
-            finally:
-                db.close()
-            
-            # Додаємо current_user до глобального контексту шаблонів
-            templates.env.globals['current_user'] = current_user
-        
-        response = await call_next(request)
-        return response 
\ No newline at end of file
+            scope.setdefault("state", {})["current_user"] = current_user
+
+        await self.app(scope, receive, send)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pure ASGI middleware, що дозволяє читати з реплік лише GET/HEAD-запитам.
+    Після успішного запиту, що змінює дані, ставить cookie db_primary на
+    REPLICA_STICKY_SECONDS: поки вона є, запити користувача читають з primary
+    і бачать власні зміни, навіть якщо репліка ще відстає.
+    Рішення доступне маршрутам як request.state.db_primary.
+    """
+
+    STICKY_COOKIE = "db_primary"
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        safe = scope["method"] in ("GET", "HEAD")
+        sticky = self.STICKY_COOKIE in HTTPConnection(scope).cookies
+        use_replica = safe and not sticky
+        scope.setdefault("state", {})["db_primary"] = not use_replica
+        token = read_from_replica.set(use_replica)
+
+        async def send_with_sticky_cookie(message: Message):
+            if message["type"] == "http.response.start" and not safe and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{self.STICKY_COOKIE}=1; Max-Age={REPLICA_STICKY_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_sticky_cookie)
+        finally:
+            read_from_replica.reset(token)
+
+
+def current_user_context(request):
+    """Контекстний процесор Jinja2: current_user для кожного шаблону без спільного глобального стану."""
+    return {"current_user": getattr(request.state, "current_user", None)}
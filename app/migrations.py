@@ -0,0 +1,221 @@
+"""
+Версійовані міграції схеми БД (MySQL та SQLite).
+
+Застосована версія зберігається в таблиці schema_version. Міграції запускаються
+один раз окремим кроком, а не в кожному воркері:
+
+    python -m app.migrations
+
+Під час старту воркер лише перевіряє версію одним запитом (check_schema).
+На новій базі перша міграція створює таблиці за поточними моделями, тому кожна
+міграція має бути ідемпотентною: перевіряти наявність колонки чи індексу перед змінами.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200)),
+    Column("applied_at", DateTime),
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    """Реєструє функцію як міграцію з номером version."""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return func
+    return decorator
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def _add_column_if_missing(connection, table: str, column: str, ddl: str):
+    columns = {c["name"] for c in inspect(connection).get_columns(table)}
+    if column not in columns:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_indexes_if_missing(connection, table, unique=None):
+    existing = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing and (unique is None or index.unique == unique):
+            index.create(bind=connection)
+
+
+def _drop_index_if_exists(connection, table: str, name: str):
+    existing = {index["name"] for index in inspect(connection).get_indexes(table)}
+    if name in existing:
+        on_table = f" ON {table}" if connection.dialect.name == "mysql" else ""
+        connection.execute(text(f"DROP INDEX {name}{on_table}"))
+
+
+@migration(1, "Базові таблиці users, locations, apartments")
+def _base_schema(connection):
+    models.Base.metadata.create_all(
+        bind=connection,
+        tables=[models.User.__table__, models.Location.__table__, models.Apartment.__table__],
+    )
+
+    # Колонки, яких немає в базах, створених до появи модерації
+    mysql = connection.dialect.name == "mysql"
+    _add_column_if_missing(connection, "users", "is_active", "BOOLEAN DEFAULT TRUE")
+    _add_column_if_missing(connection, "users", "created_at", "DATETIME DEFAULT CURRENT_TIMESTAMP")
+    _add_column_if_missing(connection, "users", "last_login", "DATETIME")
+    _add_column_if_missing(connection, "apartments", "status", "VARCHAR(20) DEFAULT 'pending'")
+    _add_column_if_missing(connection, "apartments", "created_at", "DATETIME DEFAULT CURRENT_TIMESTAMP")
+    _add_column_if_missing(connection, "apartments", "updated_at", "DATETIME ON UPDATE CURRENT_TIMESTAMP" if mysql else "DATETIME")
+    _add_column_if_missing(connection, "apartments", "moderated_by", "INTEGER")
+    _add_column_if_missing(connection, "apartments", "moderated_at", "DATETIME")
+
+
+@migration(2, "Індекси для пагінації та пошуку оголошень")
+def _listing_indexes(connection):
+    # Унікальні індекси мають власні міграції, бо потребують очищення даних
+    _create_indexes_if_missing(connection, models.Apartment.__table__, unique=False)
+    _create_indexes_if_missing(connection, models.Location.__table__, unique=False)
+
+
+@migration(3, "Таблиця матеріалізованої статистики system_stats")
+def _system_stats(connection):
+    models.SystemStats.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(4, "Унікальні адреси в locations")
+def _unique_locations(connection):
+    # Переносимо оголошення на найменший id серед однакових адрес і видаляємо дублікати.
+    # Вкладений SELECT у DELETE загорнутий у похідну таблицю, бо MySQL не дозволяє
+    # читати з таблиці, з якої видаляє
+    connection.execute(text("""
+        UPDATE apartments SET location_id = (
+            SELECT MIN(l2.id) FROM locations l1
+            JOIN locations l2
+              ON l2.city = l1.city AND l2.street = l1.street AND l2.house_number = l1.house_number
+            WHERE l1.id = apartments.location_id
+        )
+        WHERE location_id IN (
+            SELECT id FROM (
+                SELECT l1.id FROM locations l1
+                JOIN locations l2
+                  ON l2.city = l1.city AND l2.street = l1.street AND l2.house_number = l1.house_number
+                 AND l2.id < l1.id
+            ) AS duplicates
+        )
+    """))
+    connection.execute(text("""
+        DELETE FROM locations WHERE id NOT IN (
+            SELECT id FROM (
+                SELECT MIN(id) AS id FROM locations GROUP BY city, street, house_number
+            ) AS keep
+        )
+    """))
+    # Унікальний індекс починається з city, тож окремий індекс за містом більше не потрібен
+    _drop_index_if_exists(connection, "locations", "ix_locations_city")
+    _create_indexes_if_missing(connection, models.Location.__table__, unique=True)
+
+
+@migration(5, "Повнотекстовий індекс за назвою та описом оголошень")
+def _fulltext_index(connection):
+    # В обох варіантах індекс оновлює сама БД, тож будь-який запис в apartments
+    # (crud, масовий імпорт, ручні правки) одразу потрапляє в пошук
+    if connection.dialect.name == "mysql":
+        existing = {index["name"] for index in inspect(connection).get_indexes("apartments")}
+        if "ft_apartments_text" not in existing:
+            connection.execute(text("ALTER TABLE apartments ADD FULLTEXT INDEX ft_apartments_text (title, description)"))
+        return
+
+    # SQLite: FTS5-таблиця з external content, синхронізована тригерами
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS apartments_fts "
+        "USING fts5(title, description, content='apartments', content_rowid='id')"
+    ))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS apartments_fts_insert AFTER INSERT ON apartments BEGIN
+            INSERT INTO apartments_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS apartments_fts_delete AFTER DELETE ON apartments BEGIN
+            INSERT INTO apartments_fts(apartments_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """))
+    connection.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS apartments_fts_update AFTER UPDATE OF title, description ON apartments BEGIN
+            INSERT INTO apartments_fts(apartments_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO apartments_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    """))
+    connection.execute(text("INSERT INTO apartments_fts(apartments_fts) VALUES ('rebuild')"))
+
+
+@migration(6, "Індекс users.email для входу та пошуку в адмін-панелі")
+def _users_email_index(connection):
+    _create_indexes_if_missing(connection, models.User.__table__, unique=False)
+
+
+@migration(7, "Лічильник переглядів оголошень")
+def _view_count(connection):
+    _add_column_if_missing(connection, "apartments", "view_count", "INTEGER NOT NULL DEFAULT 0")
+
+
+def current_version(connection):
+    """Поточна версія схеми одним запитом; 0, якщо таблиці версій ще немає."""
+    try:
+        return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        connection.rollback()
+        return 0
+
+
+def check_schema(engine):
+    """Перевіряє, що всі міграції застосовані. Викликається під час старту воркера."""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    if version < latest_version():
+        raise RuntimeError(
+            f"Схема БД застаріла (версія {version}, потрібна {latest_version()}). "
+            "Запустіть міграції: python -m app.migrations"
+        )
+    return version
+
+
+def migrate(engine):
+    """Застосовує всі міграції, новіші за поточну версію схеми."""
+    schema_version.create(bind=engine, checkfirst=True)
+    with engine.connect() as connection:
+        version = current_version(connection)
+
+    for number, description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("Applying migration %s: %s", number, description)
+        with engine.begin() as connection:
+            apply(connection)
+            connection.execute(schema_version.insert().values(
+                version=number, description=description, applied_at=datetime.utcnow()
+            ))
+        version = number
+    return version
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Schema version: {migrate(engine)}")
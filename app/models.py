@@ -24,6 +24,11 @@ class User(Base):
     owned_apartments = relationship("Apartment", back_populates="owner", foreign_keys="Apartment.owner_id")
     moderated_apartments = relationship("Apartment", back_populates="moderator", foreign_keys="Apartment.moderated_by")
 
+    # Вхід і пошук в адмін-панелі шукають користувача за email (точно або за початком)
+    __table_args__ = (
+        Index('ix_users_email', 'email'),
+    )
+
 class Apartment(Base):
     __tablename__ = 'apartments'
 
@@ -38,12 +43,23 @@ class Apartment(Base):
     updated_at = Column(DateTime, onupdate=func.now())
     moderated_by = Column(Integer, ForeignKey('users.id'), nullable=True)
     moderated_at = Column(DateTime, nullable=True)
+    view_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     location = relationship("Location", back_populates="apartments")
     owner = relationship("User", foreign_keys=[owner_id], back_populates="owned_apartments")
     moderator = relationship("User", foreign_keys=[moderated_by], back_populates="moderated_apartments")
 
+    # Індекси під keyset-пагінацію за (created_at, id) та пошук за статусом, ціною і містом
+    __table_args__ = (
+        Index('ix_apartments_created_at_id', 'created_at', 'id'),
+        Index('ix_apartments_status_created_at_id', 'status', 'created_at', 'id'),
+        Index('ix_apartments_owner_created_at_id', 'owner_id', 'created_at', 'id'),
+        Index('ix_apartments_price_id', 'price', 'id'),
+        Index('ix_apartments_status_price_id', 'status', 'price', 'id'),
+        Index('ix_apartments_location_status_price', 'location_id', 'status', 'price'),
+    )
+
 class Location(Base):
     __tablename__ = 'locations'
 
@@ -52,4 +68,23 @@ class Location(Base):
     street = Column(String(100))
     house_number = Column(String(10))
 
-    apartments = relationship("Apartment", back_populates="location")
\ No newline at end of file
+    apartments = relationship("Apartment", back_populates="location")
+
+    # Одна адреса - один рядок; індекс також покриває фільтр за містом
+    __table_args__ = (
+        Index('uq_locations_address', 'city', 'street', 'house_number', unique=True),
+    )
+
+class SystemStats(Base):
+    """Матеріалізовані лічильники для адмін-панелі (один рядок з id=1)."""
+    __tablename__ = 'system_stats'
+
+    id = Column(Integer, primary_key=True)
+    total_users = Column(Integer, nullable=False, default=0)
+    active_users = Column(Integer, nullable=False, default=0)
+    total_apartments = Column(Integer, nullable=False, default=0)
+    pending_apartments = Column(Integer, nullable=False, default=0)
+    approved_apartments = Column(Integer, nullable=False, default=0)
+    rejected_apartments = Column(Integer, nullable=False, default=0)
+    price_total = Column(BigInteger, nullable=False, default=0)
+    total_owners = Column(Integer, nullable=False, default=0)
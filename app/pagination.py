@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional
+
+from sqlalchemy import and_, or_
+
+NEXT = "next"
+PREV = "prev"
+
+
+class InvalidCursor(ValueError):
+    """Курсор пошкоджений або не може бути розібраний."""
+
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def encode_cursor(value, row_id: int, direction: str, key: str) -> str:
+    """Пакує позицію (значення сортування, id) у непрозорий рядок для URL."""
+    if isinstance(value, datetime):
+        payload = {"t": value.isoformat(), "id": row_id, "d": direction, "k": key}
+    else:
+        payload = {"v": value, "id": row_id, "d": direction, "k": key}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str):
+    """Повертає (значення сортування, id, напрямок) з курсора, виданого для сортування за key."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value = datetime.fromisoformat(payload["t"]) if "t" in payload else payload["v"]
+        row_id = int(payload["id"])
+        direction = payload["d"]
+        cursor_key = payload["k"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+    if direction not in (NEXT, PREV):
+        raise InvalidCursor(f"Unknown direction: {direction}")
+    if cursor_key != key:
+        raise InvalidCursor(f"Cursor was issued for ordering by {cursor_key}")
+    return value, row_id, direction
+
+
+def paginate(query, order_column, id_column, limit: int, cursor: Optional[str] = None, descending: bool = True) -> Page:
+    """
+    Keyset-пагінація запиту за парою (order_column, id_column).
+
+    Замість OFFSET фільтруємо рядки за позицією з курсора, тому будь-яка
+    сторінка коштує стільки ж, скільки перша (за наявності індексу на цю пару).
+    """
+    position = decode_cursor(cursor, order_column.key) if cursor else None
+    backwards = position is not None and position[2] == PREV
+
+    # Напрямок проходу індексу: назад по сторінках — у зворотному до сортування порядку
+    walk_descending = descending != backwards
+    if position is not None:
+        value, row_id, _ = position
+        if walk_descending:
+            query = query.filter(or_(order_column < value, and_(order_column == value, id_column < row_id)))
+        else:
+            query = query.filter(or_(order_column > value, and_(order_column == value, id_column > row_id)))
+
+    if walk_descending:
+        query = query.order_by(order_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(order_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    has_next = has_more if not backwards else True
+    has_prev = position is not None if not backwards else has_more
+
+    def _cursor(row, direction):
+        return encode_cursor(getattr(row, order_column.key), getattr(row, id_column.key), direction, order_column.key)
+
+    next_cursor = _cursor(rows[-1], NEXT) if rows and has_next else None
+    prev_cursor = _cursor(rows[0], PREV) if rows and has_prev else None
+    return Page(rows, next_cursor, prev_cursor)
@@ -0,0 +1,320 @@
+"""
+Схожі оголошення за ціною, містом і текстом назви та опису.
+
+Для кожного доступного оголошення (одобреного, власник не заблокований) індекс тримає
+в пам'яті воркера вектор ознак тексту (хешовані слова з вагами tf-idf, нормовані) і
+логарифм ціни як масиви NumPy. Місто діє як жорсткий фільтр: рядки впорядковані за
+містом, тож пошук оцінює лише неперервний зріз свого міста одним множенням матриці
+на вектор і вибирає top-k через argpartition, без запитів до БД.
+
+Індекс оновлює фонова задача (запускається в lifespan): повна перебудова раз на
+SIMILAR_INDEX_REFRESH_SECONDS (з репліки, якщо вона налаштована), а між ними - лише
+оголошення, позначені crud через mark_changed, та нові рядки з основної бази.
+Маршрути читають готовий стан без блокувань.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import SIMILAR_INDEX_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Розмірність хешованого простору слів: більша точніша, але повільніша
+TEXT_DIM = 128
+# Штраф за різницю цін: 1.0 означає, що ціна вдвічі інша коштує ~0.7 схожості тексту
+PRICE_WEIGHT = 1.0
+# Як часто фонова задача перевіряє, чи є зміни для індексу (с)
+_POLL_SECONDS = 1.0
+# Понад цю кількість змінених оголошень індекс перебудовується повністю
+_MAX_INCREMENTAL_IDS = 1000
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+
+
+def _text_counts(texts):
+    """Частоти хешованих слів для кожного тексту: матриця (len(texts), TEXT_DIM) одним bincount."""
+    rows, buckets = [], []
+    for row, text in enumerate(texts):
+        for word in _WORD.findall(text.lower()):
+            rows.append(row)
+            buckets.append(zlib.crc32(word.encode()) % TEXT_DIM)
+    counts = np.bincount(
+        np.array(rows, dtype=np.int64) * TEXT_DIM + np.array(buckets, dtype=np.int64),
+        minlength=len(texts) * TEXT_DIM,
+    )
+    return counts.reshape(len(texts), TEXT_DIM).astype(np.float32)
+
+
+def _text_vectors(counts, idf):
+    """Сублінійний tf * idf з нормою 1, щоб скалярний добуток був косинусною схожістю."""
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+@dataclass(frozen=True)
+class _Index:
+    """Незмінний стан індексу, рядки впорядковані за містом."""
+    ids: np.ndarray
+    cities: np.ndarray
+    log_prices: np.ndarray
+    counts: np.ndarray
+    vectors: np.ndarray
+    idf: np.ndarray
+    city_names: tuple
+    city_slices: dict
+    positions: dict
+    version: int
+    loaded_at: float
+
+    @property
+    def max_id(self):
+        return int(self.ids.max()) if len(self.ids) else 0
+
+
+class SimilarityIndex:
+    """Індекс схожих оголошень з інкрементальним оновленням у фоновій задачі."""
+
+    def __init__(self, refresh_seconds: float = SIMILAR_INDEX_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._changed_ids = set()
+        self._changed = False
+        self._reload = False
+        self._lock = threading.Lock()
+        # Окремий короткий замок для позначок змін: _lock тримається на всю перебудову,
+        # а crud позначає зміни після кожного commit і не має на нього чекати
+        self._changes_lock = threading.Lock()
+        self._task = None
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.lookups = 0
+
+    @property
+    def version(self):
+        return self._index.version if self._index else 0
+
+    def mark_changed(self, *apartment_ids: int):
+        """
+        Позначає оголошення створеними, зміненими чи видаленими (викликається після commit).
+        Без аргументів - з'явились нові оголошення, id яких невідомі (масовий імпорт).
+        """
+        with self._changes_lock:
+            self._changed_ids.update(apartment_ids)
+            self._changed = True
+
+    def invalidate(self):
+        """Змінено невідомо які оголошення: наступне оновлення перечитає все."""
+        with self._changes_lock:
+            self._reload = True
+
+    def _take_changes(self):
+        # Позначки забираються разом, тож зроблена під час оновлення не загубиться
+        with self._changes_lock:
+            changes = self._changed_ids, self._changed, self._reload
+            self._changed_ids, self._changed, self._reload = set(), False, False
+        return changes
+
+    def _restore_changes(self, changed_ids, changed, reload):
+        with self._changes_lock:
+            self._changed_ids.update(changed_ids)
+            self._changed = self._changed or changed
+            self._reload = self._reload or reload
+
+    def needs_refresh(self):
+        index = self._index
+        return index is None or self._changed or self._reload or time.monotonic() - index.loaded_at >= self.refresh_seconds
+
+    def _select(self, db: Session, condition=None, primary: bool = False):
+        # crud імпортує цей модуль, тож database (і драйвери БД) підтягуємо лише тут
+        from .database import read_from_replica
+        query = (
+            select(
+                models.Apartment.id, models.Location.city, models.Apartment.price,
+                models.Apartment.title, models.Apartment.description,
+            )
+            .join(models.Location, models.Location.id == models.Apartment.location_id)
+            .join(models.User, models.User.id == models.Apartment.owner_id)
+            .where(
+                models.Apartment.status == "approved",
+                models.User.is_active == True,
+                models.Apartment.price.isnot(None),
+            )
+        )
+        if condition is not None:
+            query = query.where(condition)
+        # Щойно записане читаємо з основної бази: репліка могла його ще не отримати
+        token = read_from_replica.set(False) if primary else None
+        try:
+            return db.execute(query).all()
+        finally:
+            if token is not None:
+                read_from_replica.reset(token)
+
+    def _build(self, rows, city_names, ids=None, cities=None, log_prices=None, counts=None):
+        codes = {name: code for code, name in enumerate(city_names)}
+        row_ids, row_cities, row_prices, titles, descriptions = zip(*rows) if rows else ((),) * 5
+        for city in set(row_cities) - codes.keys():
+            codes[city] = len(city_names)
+            city_names.append(city)
+
+        new = (
+            np.array(row_ids, dtype=np.int64),
+            np.array([codes[city] for city in row_cities], dtype=np.int32),
+            np.log1p(np.array(row_prices, dtype=np.float32)),
+            _text_counts([f"{title} {description or ''}" for title, description in zip(titles, descriptions)]),
+        )
+        if ids is not None:
+            new = tuple(np.concatenate(pair) for pair in zip((ids, cities, log_prices, counts), new))
+        ids, cities, log_prices, counts = new
+
+        # Рядки одного міста мають іти поспіль, щоб пошук брав зріз без копіювання
+        order = np.argsort(cities, kind="stable")
+        ids, cities, log_prices, counts = ids[order], cities[order], log_prices[order], counts[order]
+        codes_present, starts, sizes = np.unique(cities, return_index=True, return_counts=True)
+
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = (np.log((1 + len(ids)) / (1 + document_frequency)) + 1).astype(np.float32)
+        previous = self._index
+        return _Index(
+            ids=ids,
+            cities=cities,
+            log_prices=log_prices,
+            counts=counts,
+            vectors=_text_vectors(counts, idf),
+            idf=idf,
+            city_names=tuple(city_names),
+            city_slices={int(code): slice(int(start), int(start + size)) for code, start, size in zip(codes_present, starts, sizes)},
+            positions=dict(zip(ids.tolist(), range(len(ids)))),
+            version=previous.version + 1 if previous else 1,
+            loaded_at=time.monotonic(),
+        )
+
+    def refresh(self, db: Session):
+        """Перебудовує індекс повністю або дочитує лише змінені та нові оголошення."""
+        with self._lock:
+            index = self._index
+            changed_ids, changed, reload = self._take_changes()
+            after_write = reload or len(changed_ids) > _MAX_INCREMENTAL_IDS
+            try:
+                if index is None or after_write or time.monotonic() - index.loaded_at >= self.refresh_seconds:
+                    # Планова перебудова може йти з репліки, а після масових змін - лише з основної бази
+                    self._index = self._build(self._select(db, primary=after_write), [])
+                    self.full_loads += 1
+                    if not after_write and (changed_ids or changed):
+                        # Репліка могла ще не отримати позначені зміни: наступне оновлення дочитає їх з основної
+                        self._restore_changes(changed_ids, changed, False)
+                    return
+
+                condition = models.Apartment.id > index.max_id
+                if changed_ids:
+                    condition = or_(condition, models.Apartment.id.in_(changed_ids))
+                rows = self._select(db, condition, primary=True)
+            except Exception:
+                self._restore_changes(changed_ids, changed, reload)
+                raise
+
+            keep = ~np.isin(index.ids, np.fromiter(changed_ids, dtype=np.int64, count=len(changed_ids)))
+            self._index = self._build(
+                rows, list(index.city_names),
+                index.ids[keep], index.cities[keep], index.log_prices[keep], index.counts[keep],
+            )
+            self.incremental_loads += 1
+
+    def similar(self, apartment, k: int):
+        """
+        id до k оголошень, найсхожіших на apartment (ORM-об'єкт з location), від найсхожішого.
+        Оголошення, якого немає в індексі (ще не одобрене чи щойно створене), оцінюється
+        за власними полями. До побудови індексу повертає порожній список.
+        """
+        index = self._index
+        if index is None or apartment.location is None or apartment.price is None:
+            return []
+        code = index.city_names.index(apartment.location.city) if apartment.location.city in index.city_names else None
+        rows = index.city_slices.get(code)
+        if rows is None:
+            return []
+        self.lookups += 1
+
+        position = index.positions.get(apartment.id)
+        if position is not None:
+            vector, log_price = index.vectors[position], index.log_prices[position]
+        else:
+            counts = _text_counts([f"{apartment.title} {apartment.description or ''}"])
+            vector, log_price = _text_vectors(counts, index.idf)[0], np.log1p(np.float32(apartment.price))
+
+        scores = index.vectors[rows] @ vector - PRICE_WEIGHT * np.abs(index.log_prices[rows] - log_price)
+        # Саме оголошення не рекомендуємо (його може не бути в зрізі, якщо місто щойно змінили)
+        own = position is not None and rows.start <= position < rows.stop
+        if own:
+            scores[position - rows.start] = -np.inf
+        candidates = min(k, len(scores) - own)
+        if candidates <= 0:
+            return []
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        top = top[np.argsort(-scores[top])]
+        return index.ids[rows][top].tolist()
+
+    def _refresh_with(self, session_factory):
+        from .database import read_from_replica
+        # У фоновій задачі немає запиту, для якого ReplicaRoutingMiddleware вмикає репліку, тож вмикаємо тут
+        token = read_from_replica.set(True)
+        try:
+            with session_factory() as db:
+                self.refresh(db)
+        finally:
+            read_from_replica.reset(token)
+
+    async def _run(self, session_factory):
+        # Як і буфер відкладеного запису, задачу просимо завершитись, а не скасовуємо
+        while not self._stopping:
+            if self.needs_refresh():
+                try:
+                    await run_in_threadpool(self._refresh_with, session_factory)
+                except Exception:
+                    logger.exception("Similar apartments index refresh failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, session_factory):
+        """Запускає фонове оновлення індексу (викликається в lifespan)."""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self):
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    def stats(self):
+        index = self._index
+        return {
+            "rows": len(index.ids) if index else 0,
+            "version": self.version,
+            "age_seconds": round(time.monotonic() - index.loaded_at, 1) if index else None,
+            "pending_changes": len(self._changed_ids),
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+            "lookups": self.lookups,
+        }
+
+
+similar_index = SimilarityIndex()
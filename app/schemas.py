@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+from .config import BULK_MODERATION_MAX_IDS
 
 class UserCreate(BaseModel):
     """
@@ -40,6 +41,9 @@ class User(BaseModel):
     last_name: str = Field(..., min_length=3, example="Doe", description="Прізвище користувача")
     phone: str = Field(..., min_length=10, max_length=10, example="1234567890", description="Номер телефону")
 
+    class Config:
+        from_attributes = True
+
 class LocationCreate(BaseModel):
     """
     Модель для створення локації.
@@ -111,6 +115,9 @@ class Location(BaseModel):
     street: str = Field(..., min_length=3, example="Khreshchatyk", description="Вулиця")
     house_number: str = Field(..., min_length=1, example="10", description="Номер будинку")
 
+    class Config:
+        from_attributes = True
+
 class Apartment(BaseModel):
     """
     Модель квартири.
@@ -143,6 +150,19 @@ class Apartment(BaseModel):
     class Config:
         from_attributes = True
 
+class ApartmentPage(BaseModel):
+    """
+    Сторінка списку оголошень з keyset-курсорами.
+    
+    Attributes:
+        items (List[Apartment]): Оголошення на сторінці
+        next_cursor (Optional[str]): Курсор наступної сторінки
+        prev_cursor (Optional[str]): Курсор попередньої сторінки
+    """
+    items: List[Apartment] = Field(..., description="Оголошення на сторінці")
+    next_cursor: Optional[str] = Field(None, description="Курсор наступної сторінки")
+    prev_cursor: Optional[str] = Field(None, description="Курсор попередньої сторінки")
+
 class UserAdmin(BaseModel):
     """
     Модель користувача для адміністративної панелі.
@@ -171,6 +191,25 @@ class UserAdmin(BaseModel):
     class Config:
         from_attributes = True
 
+class Owner(BaseModel):
+    """
+    Власник оголошення у відповідях адміністративної панелі.
+    Без обмежень полів User: старі записи користувачів не мають ламати чергу модерації.
+    
+    Attributes:
+        email (str): Електронна адреса
+        first_name (str): Ім'я
+        last_name (str): Прізвище
+        phone (str): Номер телефону
+    """
+    email: str = Field(..., example="user@example.com", description="Електронна адреса")
+    first_name: str = Field(..., example="John", description="Ім'я")
+    last_name: str = Field(..., example="Doe", description="Прізвище")
+    phone: str = Field(..., example="1234567890", description="Номер телефону")
+
+    class Config:
+        from_attributes = True
+
 class ApartmentAdmin(BaseModel):
     """
     Модель квартири для адміністративної панелі.
@@ -183,7 +222,7 @@ class ApartmentAdmin(BaseModel):
         status (str): Статус оголошення
         created_at (datetime): Дата створення
         updated_at (Optional[datetime]): Дата оновлення
-        owner (User): Інформація про власника
+        owner (Optional[Owner]): Інформація про власника (None, якщо власника немає)
         moderated_by (Optional[int]): ID модератора
         moderated_at (Optional[datetime]): Дата модерації
     """
@@ -194,10 +233,39 @@ class ApartmentAdmin(BaseModel):
     status: str = Field(..., example="pending", description="Статус оголошення")
     created_at: datetime = Field(..., description="Дата створення")
     updated_at: Optional[datetime] = Field(None, description="Дата оновлення")
-    owner: User = Field(..., description="Інформація про власника")
+    owner: Optional[Owner] = Field(None, description="Інформація про власника")
     moderated_by: Optional[int] = Field(None, example=1, description="ID модератора")
     moderated_at: Optional[datetime] = Field(None, description="Дата модерації")
 
+    class Config:
+        from_attributes = True
+
+class UserAdminPage(BaseModel):
+    """
+    Сторінка користувачів для адміністративної панелі.
+    
+    Attributes:
+        items (List[UserAdmin]): Користувачі на сторінці
+        next_cursor (Optional[str]): Курсор наступної сторінки
+        prev_cursor (Optional[str]): Курсор попередньої сторінки
+    """
+    items: List[UserAdmin] = Field(..., description="Користувачі на сторінці")
+    next_cursor: Optional[str] = Field(None, description="Курсор наступної сторінки")
+    prev_cursor: Optional[str] = Field(None, description="Курсор попередньої сторінки")
+
+class ApartmentAdminPage(BaseModel):
+    """
+    Сторінка оголошень для адміністративної панелі.
+    
+    Attributes:
+        items (List[ApartmentAdmin]): Оголошення на сторінці
+        next_cursor (Optional[str]): Курсор наступної сторінки
+        prev_cursor (Optional[str]): Курсор попередньої сторінки
+    """
+    items: List[ApartmentAdmin] = Field(..., description="Оголошення на сторінці")
+    next_cursor: Optional[str] = Field(None, description="Курсор наступної сторінки")
+    prev_cursor: Optional[str] = Field(None, description="Курсор попередньої сторінки")
+
 class ApartmentModeration(BaseModel):
     """
     Модель для модерації оголошення.
@@ -230,4 +298,111 @@ class SystemStats(BaseModel):
     approved_apartments: int = Field(..., example=35, description="Кількість одобрених квартир")
     rejected_apartments: int = Field(..., example=5, description="Кількість відхилених квартир")
     average_price: float = Field(..., example=1500.0, description="Середня ціна оренди")
-    total_owners: int = Field(..., example=30, description="Кількість власників квартир")
\ No newline at end of file
+    total_owners: int = Field(..., example=30, description="Кількість власників квартир")
+
+class ModerationFilter(BaseModel):
+    """
+    Вибір оголошень для масової модерації за умовами.
+    
+    Attributes:
+        status (str): Поточний статус оголошень
+        owner_id (int): ID власника
+        city (str): Місто
+    """
+    status: Literal["pending", "approved", "rejected"] = Field("pending", description="Поточний статус оголошень")
+    owner_id: Optional[int] = Field(None, example=2, description="ID власника")
+    city: Optional[str] = Field(None, example="Київ", description="Місто")
+
+class BulkModeration(BaseModel):
+    """
+    Масова модерація: нове значення статусу для списку ID або для всіх оголошень за фільтром.
+    
+    Attributes:
+        status (str): Новий статус
+        ids (List[int]): ID оголошень
+        filter (ModerationFilter): Умови вибору оголошень замість ids
+    """
+    status: Literal["approved", "rejected"] = Field(..., example="approved", description="Новий статус")
+    ids: Optional[List[int]] = Field(None, max_length=BULK_MODERATION_MAX_IDS, example=[1, 2, 3], description="ID оголошень")
+    filter: Optional[ModerationFilter] = Field(None, description="Умови вибору оголошень замість ids")
+
+    @validator("filter", always=True)
+    def validate_selection(cls, value, values):
+        if (value is None) == (values.get("ids") is None):
+            raise ValueError("Exactly one of ids or filter must be given")
+        return value
+
+class BulkModerationResult(BaseModel):
+    """
+    Підсумок масової модерації.
+    
+    Attributes:
+        status (str): Встановлений статус
+        matched (int): Кількість знайдених оголошень
+        changed (int): Кількість оголошень, у яких змінився статус
+        not_found (List[int]): ID зі запиту, яких немає в базі
+    """
+    status: str = Field(..., example="approved", description="Встановлений статус")
+    matched: int = Field(..., example=3, description="Кількість знайдених оголошень")
+    changed: int = Field(..., example=2, description="Кількість оголошень, у яких змінився статус")
+    not_found: List[int] = Field(..., example=[], description="ID зі запиту, яких немає в базі")
+
+class PriceHistogram(BaseModel):
+    """
+    Гістограма цін.
+    
+    Attributes:
+        edges (List[float]): Межі кошиків (на одну більше, ніж кошиків)
+        counts (List[int]): Кількість оголошень у кожному кошику
+    """
+    edges: List[float] = Field(..., example=[8000.0, 12000.0, 16000.0], description="Межі кошиків")
+    counts: List[int] = Field(..., example=[12, 5], description="Кількість оголошень у кошиках")
+
+class PriceSummary(BaseModel):
+    """
+    Статистика цін групи оголошень.
+    
+    Attributes:
+        count (int): Кількість оголошень
+        mean (float): Середня ціна
+        min (float): Мінімальна ціна
+        max (float): Максимальна ціна
+        p10, p25, median, p75, p90 (float): Перцентилі ціни
+        histogram (PriceHistogram): Розподіл цін між min і max
+    """
+    count: int = Field(..., example=17, description="Кількість оголошень")
+    mean: float = Field(..., example=11500.0, description="Середня ціна")
+    min: float = Field(..., example=8000.0, description="Мінімальна ціна")
+    max: float = Field(..., example=16000.0, description="Максимальна ціна")
+    p10: float = Field(..., example=8500.0, description="10-й перцентиль")
+    p25: float = Field(..., example=9500.0, description="25-й перцентиль")
+    median: float = Field(..., example=11000.0, description="Медіана")
+    p75: float = Field(..., example=13000.0, description="75-й перцентиль")
+    p90: float = Field(..., example=15000.0, description="90-й перцентиль")
+    histogram: PriceHistogram = Field(..., description="Розподіл цін")
+
+class CityPriceSummary(PriceSummary):
+    """
+    Статистика цін у місті.
+    
+    Attributes:
+        city (str): Місто
+    """
+    city: str = Field(..., example="Київ", description="Місто")
+
+class PriceAnalytics(BaseModel):
+    """
+    Аналітика цін оголошень.
+    
+    Attributes:
+        status (str): Статус оголошень, за якими порахована статистика
+        generated_at (datetime): Час знімка даних
+        overall (PriceSummary): Статистика по всіх містах
+        cities (List[CityPriceSummary]): Статистика по містах
+        price_rank (float): Відсоток оголошень, дешевших за задану ціну
+    """
+    status: str = Field(..., example="approved", description="Статус оголошень")
+    generated_at: datetime = Field(..., description="Час знімка даних")
+    overall: Optional[PriceSummary] = Field(None, description="Статистика по всіх містах")
+    cities: List[CityPriceSummary] = Field(..., description="Статистика по містах")
+    price_rank: Optional[float] = Field(None, example=42.5, description="Відсоток оголошень, дешевших за задану ціну")
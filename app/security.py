@@ -0,0 +1,79 @@
+"""
+Хешування паролів bcrypt в окремому обмеженому пулі потоків.
+
+bcrypt навмисно повільний (десятки мілісекунд), тому в циклі подій він зупинив би
+всі запити воркера, а в спільному threadpool FastAPI - витіснив би синхронні маршрути.
+Власний пул обмежує паралельність, а ліміт черги відповідає 503 замість того,
+щоб під час сплеску логінів накопичувати запити, які все одно не дочекаються.
+"""
+import asyncio
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from .config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, BCRYPT_ROUNDS
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+# Кількість задач у пулі (виконуються та чекають). Змінюється лише з циклу подій
+_in_flight = 0
+
+
+async def _run(func, *args):
+    global _in_flight
+    if _in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later", headers={"Retry-After": "1"})
+
+    _in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _in_flight -= 1
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash():
+    # Хеш для перевірки пароля неіснуючого користувача, щоб відповідь займала той самий час
+    return pwd_context.hash("dummy-password")
+
+
+def _verify_missing_user(password: str):
+    pwd_context.verify(password, _dummy_hash())
+    return False, None
+
+
+def _verify(password: str, stored: str):
+    if pwd_context.identify(stored, required=False) is None:
+        # Старий запис з паролем у відкритому вигляді: перевіряємо і одразу готуємо хеш
+        if hmac.compare_digest(password.encode(), stored.encode()):
+            return True, pwd_context.hash(password)
+        return False, None
+    return pwd_context.verify_and_update(password, stored)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, stored: str = None):
+    """
+    Перевіряє пароль. Повертає (valid, new_hash): new_hash не None, якщо збережене
+    значення треба замінити (пароль у відкритому вигляді або застарілі параметри хешу).
+    Для stored=None (користувача не знайдено) все одно виконує bcrypt і повертає (False, None).
+    """
+    if stored is None:
+        return await _run(_verify_missing_user, password)
+    return await _run(_verify, password, stored)
+
+
+def stats():
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "queue_size": PASSWORD_HASH_QUEUE_SIZE,
+        "in_flight": _in_flight,
+    }
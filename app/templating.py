@@ -0,0 +1,77 @@
+"""
+Шаблони Jinja2: кеш байт-коду на диску, прогрів під час старту та потокові відповіді.
+
+Скомпільовані шаблони зберігаються в TEMPLATE_CACHE_DIR, тож новий воркер
+завантажує готовий байт-код замість компіляції, а прогрів у lifespan робить це
+до першого запиту. З STREAM_TEMPLATES сторінка віддається через Template.generate
+шматками по TEMPLATE_STREAM_CHUNK_SIZE, а картки головної рендеряться під час віддачі.
+На сторінці з MAX_PAGE_SIZE карток (~50 КБ) це дає менший час до першого байта, коли
+картки не в кеші, і менший пік пам'яті, але трохи довшу віддачу всієї сторінки
+(див. benchmarks.template_render).
+"""
+import logging
+import os
+import time
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+from fastapi.responses import StreamingResponse
+
+from .config import TEMPLATE_CACHE_DIR, STREAM_TEMPLATES, TEMPLATE_STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def create_templates(directory: str, context_processors=None, cache_dir: str = TEMPLATE_CACHE_DIR):
+    """Jinja2Templates з тими самими налаштуваннями, що й за замовчуванням у Starlette, плюс кеш байт-коду."""
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(cache_dir),
+    )
+    return Jinja2Templates(env=env, context_processors=context_processors)
+
+
+def warm_up(templates: Jinja2Templates):
+    """Завантажує всі шаблони (з кешу байт-коду або компілюючи), щоб перший запит не чекав."""
+    started = time.perf_counter()
+    names = templates.env.list_templates()
+    for name in names:
+        templates.get_template(name)
+    logger.info("Loaded %s templates in %.1f ms", len(names), (time.perf_counter() - started) * 1000)
+
+
+def _chunks(parts, size: int):
+    # Template.generate віддає кожен текстовий вузол окремо; дрібні шматки збираємо в більші
+    buffer, buffered = [], 0
+    for part in parts:
+        data = part.encode()
+        buffer.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def page_response(templates: Jinja2Templates, name: str, context: dict, stream: bool = None):
+    """
+    Сторінка з шаблону: звичайний TemplateResponse або, з STREAM_TEMPLATES, потокова відповідь.
+    Для потоку дані з БД мають бути завантажені заздалегідь: сесія закривається до початку стрімінгу.
+    Ліниві значення (наприклад, генератор карток) допустимі, якщо вони не звертаються до БД.
+    """
+    if not (STREAM_TEMPLATES if stream is None else stream):
+        return templates.TemplateResponse(name, context)
+
+    request = context["request"]
+    for processor in templates.context_processors:
+        context.update(processor(request))
+    template = templates.get_template(name)
+    # Синхронний генератор StreamingResponse обходить у threadpool, тож рендеринг не блокує цикл подій
+    return StreamingResponse(
+        _chunks(template.generate(context), TEMPLATE_STREAM_CHUNK_SIZE),
+        media_type="text/html",
+    )
@@ -0,0 +1,144 @@
+"""
+Відкладений запис малоцінних змін: час останнього входу та лічильники переглядів.
+
+Маршрути лише додають зміну в буфер у пам'яті воркера, а фонова задача раз на
+WRITE_BEHIND_INTERVAL_SECONDS (або раніше, коли набереться WRITE_BEHIND_MAX_PENDING
+записів) записує все одним executemany UPDATE на таблицю. Під час зупинки воркера
+буфер скидається повністю. Якщо воркер впаде, втратяться лише зміни за останній інтервал.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import models
+from .config import WRITE_BEHIND_INTERVAL_SECONDS, WRITE_BEHIND_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+_users = models.User.__table__
+_apartments = models.Apartment.__table__
+
+# Явне updated_at = updated_at не дає onupdate моделі (і ON UPDATE CURRENT_TIMESTAMP у MySQL)
+# змінити дату оновлення оголошення через перегляд, бо від неї залежать ETag і кеш карток
+_VIEWS_UPDATE = (
+    update(_apartments)
+    .where(_apartments.c.id == bindparam("apartment_id"))
+    .values(view_count=_apartments.c.view_count + bindparam("views"), updated_at=_apartments.c.updated_at)
+)
+_LOGINS_UPDATE = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(last_login=bindparam("logged_in_at"))
+)
+
+
+class WriteBehindBuffer:
+    """
+    Буфер відкладених записів. Методи record_* викликаються з циклу подій
+    (async-маршрути), тому додаткові блокування не потрібні.
+    """
+
+    def __init__(self, interval: float = WRITE_BEHIND_INTERVAL_SECONDS, max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._logins = {}
+        self._views = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._stopping = False
+        self.buffered = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_flush_at = None
+
+    @property
+    def pending(self):
+        return len(self._logins) + len(self._views)
+
+    def record_login(self, user_id: int, logged_in_at: datetime = None):
+        # Для входів важливий лише останній час, тож повторні входи не збільшують буфер
+        self._logins[user_id] = logged_in_at or datetime.utcnow()
+        self._recorded()
+
+    def record_view(self, apartment_id: int):
+        self._views[apartment_id] = self._views.get(apartment_id, 0) + 1
+        self._recorded()
+
+    def _recorded(self):
+        self.buffered += 1
+        if self.pending >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self, engine):
+        """Записує накопичені зміни одним пакетом на таблицю. Повертає кількість оновлених рядків."""
+        logins, self._logins = self._logins, {}
+        views, self._views = self._views, {}
+        if not logins and not views:
+            return 0
+
+        try:
+            async with engine.begin() as connection:
+                if logins:
+                    await connection.execute(_LOGINS_UPDATE, [
+                        {"user_id": user_id, "logged_in_at": logged_in_at} for user_id, logged_in_at in logins.items()
+                    ])
+                if views:
+                    await connection.execute(_VIEWS_UPDATE, [
+                        {"apartment_id": apartment_id, "views": count} for apartment_id, count in views.items()
+                    ])
+        except SQLAlchemyError:
+            # Повертаємо зміни в буфер, щоб записати їх наступного разу
+            self.errors += 1
+            logger.exception("Write-behind flush failed, %s rows kept for retry", len(logins) + len(views))
+            for user_id, logged_in_at in logins.items():
+                self._logins.setdefault(user_id, logged_in_at)
+            for apartment_id, count in views.items():
+                self._views[apartment_id] = self._views.get(apartment_id, 0) + count
+            return 0
+
+        self.flushes += 1
+        self.flushed += len(logins) + len(views)
+        self.last_flush_at = datetime.utcnow()
+        return len(logins) + len(views)
+
+    async def _run(self, engine):
+        # Задачу не скасовуємо, а просимо завершитись: скасування посеред flush втратило б зміни
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush(engine)
+
+    def start(self, engine):
+        """Запускає фонову задачу скидання буфера (викликається в lifespan)."""
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(engine))
+
+    async def stop(self, engine):
+        """Зупиняє фонову задачу і записує все, що залишилось у буфері."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush(engine)
+
+    def stats(self):
+        return {
+            "pending": self.pending,
+            "buffered": self.buffered,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+        }
+
+
+buffer = WriteBehindBuffer()
@@ -0,0 +1,118 @@
+"""
+Пропускна здатність одного воркера при конкурентних запитах до сторінки списку:
+синхронна сесія всередині async-маршруту (до) проти AsyncSession (після).
+
+Запуск: python -m benchmarks.async_throughput [--concurrency 50] [--requests 2000]
+    [--url mysql+mysqlconnector://... --async-url mysql+aiomysql://...]
+Без --url використовується тимчасова SQLite база (aiosqlite для async) зі штучною
+затримкою --latency-ms на кожен запит, що імітує мережевий round trip до MySQL.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import async_crud, crud
+from benchmarks.seed import seed
+
+PAGE_SIZE = 20
+
+
+def add_sqlite_latency(engine, seconds):
+    """Затримка на кожен SQL-запит у потоці, що його виконує (як очікування мережі)."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        def delay(statement):
+            time.sleep(seconds)
+
+        if hasattr(dbapi_connection, "await_"):
+            # aiosqlite виконує запити у власному потоці, тож цикл подій не блокується
+            dbapi_connection.await_(dbapi_connection.driver_connection.set_trace_callback(delay))
+        else:
+            dbapi_connection.set_trace_callback(delay)
+
+
+def build_app(url, async_url):
+    engine = create_engine(url)
+    async_engine = create_async_engine(async_url)
+    Session = sessionmaker(bind=engine)
+    AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    app = FastAPI()
+
+    @app.get("/before")
+    async def before():
+        # Як було: синхронні запити прямо в циклі подій
+        with Session() as db:
+            page = crud.get_apartments_page(db, PAGE_SIZE)
+        return {"items": len(page.items)}
+
+    @app.get("/after")
+    async def after():
+        async with AsyncSession() as db:
+            page = await async_crud.get_apartments_page(db, PAGE_SIZE)
+        return {"items": len(page.items)}
+
+    return app, engine, async_engine
+
+
+async def drive(app, path, concurrency, total):
+    """Надсилає total запитів з concurrency одночасними клієнтами, повертає req/s."""
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(total))
+
+    async def worker(client):
+        for _ in remaining:
+            response = await client.get(path)
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(path)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--apartments", type=int, default=10000)
+    parser.add_argument("--url")
+    parser.add_argument("--async-url")
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.url:
+        url, async_url = args.url, args.async_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        url, async_url = "sqlite:///" + path, "sqlite+aiosqlite:///" + path
+
+    app, engine, async_engine = build_app(url, async_url)
+    seed(engine, users=200, apartments=args.apartments)
+    engine.dispose()
+    if not args.url and args.latency_ms:
+        add_sqlite_latency(engine, args.latency_ms / 1000)
+        add_sqlite_latency(async_engine.sync_engine, args.latency_ms / 1000)
+
+    async def run():
+        try:
+            for label, route in (("before (sync session)", "/before"), ("after (AsyncSession)", "/after")):
+                rps = await drive(app, route, args.concurrency, args.requests)
+                print(f"{label:>22}: {rps:8.1f} req/s at concurrency {args.concurrency}")
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
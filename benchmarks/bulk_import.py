@@ -0,0 +1,72 @@
+"""
+Імпорт пакета оголошень: по одному через crud.create_apartment (до)
+проти crud.bulk_create_apartments в одній транзакції (після).
+
+Запуск: python -m benchmarks.bulk_import [--rows 2000] [--latency-ms 1.0]
+Використовується тимчасова SQLite база зі штучною затримкою --latency-ms на кожен
+запит, що імітує мережевий round trip до MySQL.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.instrumentation import count_queries
+from benchmarks.async_throughput import add_sqlite_latency
+from benchmarks.seed import CITIES, STREETS, seed
+
+
+def make_rows(count, random_seed=7):
+    rnd = random.Random(random_seed)
+    return [
+        schemas.ApartmentCreate(
+            title=f"Імпорт {i:06d}",
+            description="Квартира з пакетного імпорту",
+            price=rnd.randrange(5000, 50000, 500),
+            location=schemas.LocationCreate(
+                city=rnd.choice(CITIES), street=rnd.choice(STREETS), house_number=str(rnd.randint(1, 50))
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+    seed(engine, users=10, apartments=100)
+    engine.dispose()
+    if args.latency_ms:
+        add_sqlite_latency(engine, args.latency_ms / 1000)
+    Session = sessionmaker(bind=engine)
+    rows = make_rows(args.rows)
+
+    with Session() as db:
+        owner = db.get(models.User, 2)
+
+        with count_queries(engine) as before:
+            started = time.perf_counter()
+            for apartment in rows:
+                crud.create_apartment(db, apartment, owner.id)
+            before_time = time.perf_counter() - started
+
+        with count_queries(engine) as after:
+            started = time.perf_counter()
+            crud.bulk_create_apartments(db, rows, owner)
+            after_time = time.perf_counter() - started
+
+    print(f"before (row by row): {before_time:7.2f} s, {before.count} queries for {args.rows} rows")
+    print(f"after (bulk insert): {after_time:7.2f} s, {after.count} queries for {args.rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Перевірка планів запитів пошуку: жоден варіант фільтрів не має робити повний скан таблиці.
+
+Запуск: python -m benchmarks.explain_search [--apartments 100000] [--url mysql+mysqlconnector://...]
+Без --url використовується тимчасова SQLite база. Для MySQL база має бути порожньою.
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.instrumentation import count_queries
+from benchmarks.seed import seed
+
+ADMIN = SimpleNamespace(id=1, is_admin=True)
+
+FILTERS = {
+    "city": [None, "Львів"],
+    "price": [(None, None), (10000, None), (10000, 20000)],
+    "status": [None, "pending"],
+    "sort": ["recent", "price"],
+    "user": [None, ADMIN],
+}
+
+
+def _combinations():
+    keys = list(FILTERS)
+    for values in itertools.product(*FILTERS.values()):
+        combo = dict(zip(keys, values))
+        min_price, max_price = combo.pop("price")
+        current_user = combo.pop("user")
+        yield dict(combo, min_price=min_price, max_price=max_price, current_user=current_user)
+
+
+def _full_scans(connection, statement, parameters):
+    """Повертає рядки плану, що означають повний скан таблиці."""
+    if connection.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        # "SCAN table" без "USING INDEX" — прохід по всій таблиці
+        return [row[-1] for row in plan if row[-1].startswith("SCAN") and "USING" not in row[-1]]
+    plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().fetchall()
+    return [f"{row['table']}: type=ALL" for row in plan if row["type"] == "ALL"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apartments", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "explain.db")
+    engine = create_engine(url)
+    seed(engine, users=args.users, apartments=args.apartments)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE TABLE apartments, locations, users"))
+
+    Session = sessionmaker(bind=engine)
+    failures = 0
+    for combo in _combinations():
+        with Session() as db, count_queries(engine) as counter:
+            page = crud.search_apartments(db, limit=20, **combo)
+            if page.next_cursor:
+                crud.search_apartments(db, limit=20, cursor=page.next_cursor, **combo)
+
+        with engine.connect() as connection:
+            for statement, parameters in counter.statements:
+                scans = _full_scans(connection, statement, parameters)
+                if scans:
+                    failures += 1
+                    label = {k: v for k, v in combo.items() if k != "current_user"}
+                    label["admin"] = combo["current_user"] is not None
+                    print(f"FULL SCAN {label}: {scans}")
+
+    if failures:
+        sys.exit(1)
+    print("OK: no full table scans")
+
+
+if __name__ == "__main__":
+    main()
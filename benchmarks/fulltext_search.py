@@ -0,0 +1,48 @@
+"""
+Час повнотекстового пошуку на великій базі.
+
+Запуск: python -m benchmarks.fulltext_search [--apartments 100000] [--url mysql+mysqlconnector://...]
+Без --url використовується тимчасова SQLite база з FTS5. Для MySQL база має бути порожньою.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, migrations
+from benchmarks.seed import seed
+
+QUERIES = ["балкон", "світла студія", "ремонт парк метро", "Квартира 4242", "неіснуюче"]
+REPEAT = 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apartments", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(url)
+    # Міграції створюють повнотекстовий індекс, який заповнюється під час вставки даних
+    migrations.migrate(engine)
+    seed(engine, users=1000, apartments=args.apartments)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        for q in QUERIES:
+            timings = []
+            for _ in range(REPEAT):
+                started = time.perf_counter()
+                found = crud.fulltext_search_apartments(db, q, args.limit)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{q!r:>22}: {len(found):3} results, median {statistics.median(timings):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Навантажувальний тест усіх маршрутів app.main: пропускна здатність і p50/p95/p99 на маршрут.
+
+Запуск: python -m benchmarks.load_test [--users 200] [--apartments 10000] [--locations N]
+    [--concurrency 20] [--requests 500] [--output baseline.json]
+    [--url mysql+mysqlconnector://... --async-url mysql+aiomysql://...]
+Без --url використовується тимчасова SQLite база. Для MySQL база має бути порожньою.
+Результат - JSON (у файл --output або в stdout), який зручно порівнювати між змінами.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, select
+
+from app import migrations, models
+from benchmarks.seed import CITIES, STREETS, seed
+
+
+def _percentile(quantiles, p):
+    return round(quantiles[p - 1], 2) if quantiles else None
+
+
+def summarize(latencies, statuses, elapsed):
+    """Зведення по маршруту: req/s, перцентилі затримки в мс і розподіл кодів відповіді."""
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for code, count in statuses.items() if int(code) >= 400),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": _percentile(quantiles, 50),
+        "p95_ms": _percentile(quantiles, 95),
+        "p99_ms": _percentile(quantiles, 99),
+        "statuses": statuses,
+    }
+
+
+async def drive(client, build_request, total, concurrency):
+    """
+    Виконує total запитів з concurrency одночасними воркерами.
+    build_request(i) повертає (method, url, kwargs) для i-го запиту.
+    """
+    latencies, statuses = [], {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for i in remaining:
+            method, url, kwargs = build_request(i)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            code = str(response.status_code)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, time.perf_counter() - started)
+
+
+def apartment_payload(rnd, i):
+    return {
+        "title": f"Навантаження {i}",
+        "description": "Оголошення, створене навантажувальним тестом",
+        "price": rnd.randrange(3000, 60000, 500),
+        "location": {"city": rnd.choice(CITIES), "street": rnd.choice(STREETS), "house_number": str(rnd.randint(1, 300))},
+    }
+
+
+def pick_fixtures(engine):
+    """Ідентифікатори для сценаріїв: активний власник оголошень, одобрені та неперевірені оголошення."""
+    apartments, users = models.Apartment.__table__, models.User.__table__
+    with engine.connect() as connection:
+        owner = connection.execute(
+            select(users.c.id, users.c.email)
+            .join(apartments, apartments.c.owner_id == users.c.id)
+            .where(users.c.is_active == True, users.c.is_admin == False)
+            .order_by(users.c.id).limit(1)
+        ).one()
+        approved = connection.execute(
+            select(apartments.c.id).join(users, users.c.id == apartments.c.owner_id)
+            .where(apartments.c.status == "approved", users.c.is_active == True)
+        ).scalars().all()
+        pending = connection.execute(
+            select(apartments.c.id).where(apartments.c.status == "pending")
+        ).scalars().all()
+    return owner, approved, pending
+
+
+def created_apartments(engine, owner_id):
+    apartments = models.Apartment.__table__
+    with engine.connect() as connection:
+        return connection.execute(
+            select(apartments.c.id)
+            .where(apartments.c.owner_id == owner_id, apartments.c.title.like("Навантаження %"))
+            .order_by(apartments.c.id)
+        ).scalars().all()
+
+
+async def run(app, engine, args):
+    from app import auth
+
+    rnd = random.Random(args.seed)
+    owner, approved, pending = pick_fixtures(engine)
+    tokens = {
+        "user": auth.create_access_token({"sub": owner.email}),
+        "admin": auth.create_access_token({"sub": "admin@example.com"}),
+    }
+    n, concurrency = args.requests, args.concurrency
+    created = []
+
+    def client(role=None):
+        cookies = {"access_token": tokens[role]} if role else None
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", cookies=cookies)
+
+    scenarios = [
+        ("GET /", None, lambda i: ("GET", "/", {})),
+        ("GET /apartments/{id}", None, lambda i: ("GET", f"/apartments/{rnd.choice(approved)}", {})),
+        ("GET /profile/", "user", lambda i: ("GET", "/profile/", {})),
+        ("GET /admin/", "admin", lambda i: ("GET", "/admin/", {})),
+        ("GET /login/", None, lambda i: ("GET", "/login/", {})),
+        ("POST /login/", None, lambda i: ("POST", "/login/", {"data": {"email": owner.email, "password": "password"}})),
+        ("POST /register/", None, lambda i: ("POST", "/register/", {"data": {
+            "email": f"load{args.seed}-{i}@example.com", "password": "password", "confirm_password": "password",
+            "first_name": "Load", "last_name": "Test", "phone": f"{i:010d}",
+        }})),
+        ("POST /apartments/", "user", lambda i: ("POST", "/apartments/", {"json": apartment_payload(rnd, i)})),
+        ("PUT /apartments/{id}/edit/", "user", lambda i: ("PUT", f"/apartments/{created[i % len(created)]}/edit/", {
+            "json": apartment_payload(rnd, i),
+        })),
+        ("POST /admin/apartments/{id}/moderate", "admin", lambda i: (
+            "POST", f"/admin/apartments/{pending[i % len(pending)]}/moderate",
+            {"data": {"status": rnd.choice(["approved", "rejected"])}},
+        )),
+        ("DELETE /apartments/{id}", "user", lambda i: ("DELETE", f"/apartments/{created[i]}", {})),
+    ]
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name, role, build_request in scenarios:
+            total = min(n, len(created)) if name.startswith("DELETE") else n
+            async with client(role) as http:
+                results[name] = await drive(http, build_request, total, concurrency)
+            if name == "POST /apartments/":
+                # Створені оголошення потрібні сценаріям редагування та видалення
+                created.extend(created_apartments(engine, owner.id))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--apartments", type=int, default=10000)
+    parser.add_argument("--locations", type=int)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500, help="запитів на кожен маршрут")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output")
+    parser.add_argument("--url")
+    parser.add_argument("--async-url")
+    args = parser.parse_args()
+
+    if args.url:
+        url, async_url = args.url, args.async_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        url, async_url = "sqlite:///" + path, "sqlite+aiosqlite:///" + path
+
+    # app.config читає адреси БД під час імпорту, тож застосунок імпортуємо після їх встановлення
+    os.environ["DATABASE_URL"], os.environ["ASYNC_DATABASE_URL"] = url, async_url
+    from app.database import async_engine
+    from app.main import app
+
+    engine = create_engine(url)
+    migrations.migrate(engine)
+    seed(engine, users=args.users, apartments=args.apartments, locations=args.locations, random_seed=args.seed)
+
+    async def run_and_dispose():
+        try:
+            return await run(app, engine, args)
+        finally:
+            await async_engine.dispose()
+
+    report = {
+        "config": {
+            "users": args.users,
+            "apartments": args.apartments,
+            "locations": args.locations or args.apartments,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "database": engine.dialect.name,
+        },
+        "routes": asyncio.run(run_and_dispose()),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Вхід під навантаженням: bcrypt прямо в циклі подій (до) проти окремого пулу потоків (після).
+
+Для кожного варіанта одночасно з логінами вимірюється затримка циклу подій
+(наскільки пізніше за заплановане прокидається asyncio.sleep): вона показує,
+скільки чекали б усі інші запити воркера.
+
+Запуск: python -m benchmarks.login_throughput [--concurrency 50] [--requests 200] [--rounds 12]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app import security
+
+PASSWORD = "password"
+
+
+def build_app(password_hash):
+    app = FastAPI()
+
+    @app.post("/inline")
+    async def inline():
+        # Як було б без пулу: bcrypt блокує цикл подій
+        return {"valid": security.pwd_context.verify(PASSWORD, password_hash)}
+
+    @app.post("/pooled")
+    async def pooled():
+        valid, _ = await security.verify_password(PASSWORD, password_hash)
+        return {"valid": valid}
+
+    return app
+
+
+async def measure(app, path, concurrency, total):
+    """Повертає (логінів/с, p95 затримки циклу подій у мс) під час навантаження логінами."""
+    transport = httpx.ASGITransport(app=app)
+    remaining = iter(range(total))
+    lags = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login_worker():
+            for _ in remaining:
+                response = await client.post(path)
+                response.raise_for_status()
+
+        async def lag_probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+        probe = asyncio.create_task(lag_probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    p95 = statistics.quantiles(lags, n=20)[-1] if len(lags) > 1 else lags[0]
+    return total / elapsed, p95
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    security.pwd_context.update(bcrypt__rounds=args.rounds)
+    app = build_app(security.pwd_context.hash(PASSWORD))
+
+    async def run():
+        for label, path in (("before (inline bcrypt)", "/inline"), ("after (hash pool)", "/pooled")):
+            rps, lag_p95 = await measure(app, path, args.concurrency, args.requests)
+            print(f"{label:>22}: {rps:7.1f} logins/s, event loop lag p95 {lag_p95:8.1f} ms "
+                  f"(concurrency {args.concurrency}, {security.PASSWORD_HASH_WORKERS} hash workers)")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
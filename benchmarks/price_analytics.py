@@ -0,0 +1,88 @@
+"""
+Аналітика цін: GROUP BY по таблиці проти знімка NumPy у пам'яті.
+
+Запуск: python -m benchmarks.price_analytics [--apartments 100000] [--changes 100]
+    [--url mysql+mysqlconnector://... --async-url mysql+aiomysql://...]
+Без --url використовується тимчасова SQLite база. Для MySQL база має бути порожньою.
+GROUP BY рахує лише кількість/середню/min/max (перцентилів у SQL немає), знімок - усе разом
+з перцентилями й гістограмами.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, func, update
+from sqlalchemy.orm import sessionmaker
+
+from app import migrations, models
+from benchmarks.seed import seed
+
+REPEAT = 20
+
+
+def timed(func, repeat=REPEAT):
+    """Медіана часу виклику в мс."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apartments", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=100, help="змінених оголошень між запитами")
+    parser.add_argument("--url")
+    parser.add_argument("--async-url")
+    args = parser.parse_args()
+
+    if args.url:
+        url, async_url = args.url, args.async_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        url, async_url = "sqlite:///" + path, "sqlite+aiosqlite:///" + path
+    # app.config читає адреси БД під час імпорту, а інкрементальне оновлення знімка імпортує app.database
+    os.environ["DATABASE_URL"], os.environ["ASYNC_DATABASE_URL"] = url, async_url
+    from app.analytics import PriceSnapshot
+
+    engine = create_engine(url)
+    migrations.migrate(engine)
+    seed(engine, users=1000, apartments=args.apartments)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        group_by = (
+            db.query(
+                models.Location.city,
+                func.count(models.Apartment.id), func.avg(models.Apartment.price),
+                func.min(models.Apartment.price), func.max(models.Apartment.price),
+            )
+            .join(models.Location, models.Location.id == models.Apartment.location_id)
+            .filter(models.Apartment.status == "approved")
+            .group_by(models.Location.city)
+        )
+        print(f"{'GROUP BY per city':>28}: {timed(group_by.all):8.2f} ms")
+
+        snapshot = PriceSnapshot()
+        print(f"{'snapshot full load':>28}: {timed(lambda: snapshot._load(db), repeat=3):8.2f} ms")
+        print(f"{'report (vectorised stats)':>28}: {timed(lambda: snapshot._reports.clear() or snapshot.report(db)):8.2f} ms")
+        print(f"{'report (cached)':>28}: {timed(lambda: snapshot.report(db)):8.2f} ms")
+
+        ids = [row.id for row in db.query(models.Apartment.id).limit(args.changes)]
+
+        def change_and_refresh():
+            db.execute(update(models.Apartment).where(models.Apartment.id.in_(ids)).values(price=models.Apartment.price + 1))
+            db.commit()
+            snapshot.mark_changed(*ids)
+            snapshot.report(db)
+
+        print(f"{f'{args.changes} changes + refresh':>28}: {timed(change_and_refresh):8.2f} ms")
+        print(f"{'snapshot':>28}: {snapshot.stats()}")
+
+
+if __name__ == "__main__":
+    main()
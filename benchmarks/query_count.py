@@ -0,0 +1,45 @@
+"""
+Перевірка, що кількість SQL-запитів на сторінку списку не залежить від її розміру.
+
+Запуск: python -m benchmarks.query_count
+"""
+import os
+
+from jinja2 import Environment, FileSystemLoader
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.instrumentation import count_queries
+from benchmarks.seed import seed
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "app", "templates")
+PAGE_SIZES = [10, 100, 1000]
+
+
+def main():
+    engine = create_engine("sqlite://")
+    seed(engine, users=50, apartments=max(PAGE_SIZES))
+    Session = sessionmaker(bind=engine)
+
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+    env.globals["url_for"] = lambda name, path: f"/{name}/{path}"
+    card = env.get_template("apartment_item.html")
+
+    counts = {}
+    for size in PAGE_SIZES:
+        with Session() as db, count_queries(engine) as home:
+            for apartment in crud.get_apartments(db, limit=size):
+                card.render(apartment=apartment)
+        with Session() as db, count_queries(engine) as profile:
+            for apartment in crud.get_user_apartments(db, user_id=2):
+                card.render(apartment=apartment)
+        counts[size] = (home.count, profile.count)
+        print(f"page size {size:>5}: home {home.count} queries, profile {profile.count} queries")
+
+    if len({c for c in counts.values()}) != 1:
+        raise SystemExit("Кількість запитів залежить від розміру сторінки")
+
+
+if __name__ == "__main__":
+    main()
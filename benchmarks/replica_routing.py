@@ -0,0 +1,89 @@
+"""
+Перевірка маршрутизації читань на репліку з двома SQLite-файлами (primary і replica).
+
+Запуск: python -m benchmarks.replica_routing
+Репліка - копія primary після заповнення, тож обидві бази мають однакові дані.
+Для кожного сценарію рахуються запити на кожну базу; невідповідність очікуванню
+завершує скрипт з помилкою.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack
+
+import httpx
+from sqlalchemy import create_engine
+
+from app import migrations
+from benchmarks.seed import seed
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    primary, replica = os.path.join(directory, "primary.db"), os.path.join(directory, "replica.db")
+    engine = create_engine("sqlite:///" + primary)
+    migrations.migrate(engine)
+    seed(engine, users=20, apartments=200)
+    engine.dispose()
+    shutil.copy(primary, replica)
+
+    # app.config читає адреси БД під час імпорту, тож застосунок імпортуємо після їх встановлення
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + primary,
+        "ASYNC_DATABASE_URL": "sqlite+aiosqlite:///" + primary,
+        "DATABASE_REPLICA_URLS": "sqlite:///" + replica,
+        "ASYNC_DATABASE_REPLICA_URLS": "sqlite+aiosqlite:///" + replica,
+    })
+    from app import auth, database
+    from app.instrumentation import count_queries
+    from app.main import app
+
+    engines = {
+        "primary": [database.engine, database.async_engine.sync_engine],
+        "replica": database.replica_engines + [e.sync_engine for e in database.async_replica_engines],
+    }
+    token = auth.create_access_token({"sub": "admin@example.com"})
+    apartment = {
+        "title": "Перевірка реплік",
+        "description": "Оголошення для перевірки маршрутизації",
+        "price": 10000,
+        "location": {"city": "Київ", "street": "Хрещатик", "house_number": "1"},
+    }
+    scenarios = [
+        ("GET / (anonymous)", "GET", "/", {}, {}, "replica"),
+        ("GET /profile/", "GET", "/profile/", {"access_token": token}, {}, "replica"),
+        ("POST /apartments/", "POST", "/apartments/", {"access_token": token}, {"json": apartment}, "primary"),
+        ("GET /profile/ (sticky)", "GET", "/profile/", {"access_token": token, "db_primary": "1"}, {}, "primary"),
+    ]
+
+    async def run():
+        failures = []
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            for label, method, path, cookies, kwargs, expected in scenarios:
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=cookies) as client:
+                    with ExitStack() as stack:
+                        counters = {
+                            name: [stack.enter_context(count_queries(e)) for e in group]
+                            for name, group in engines.items()
+                        }
+                        response = await client.request(method, path, **kwargs)
+                counts = {name: sum(c.count for c in group) for name, group in counters.items()}
+                sticky = "db_primary" in response.headers.get("set-cookie", "")
+                print(f"{label:>24}: {response.status_code}, primary {counts['primary']} queries, "
+                      f"replica {counts['replica']} queries, sticky cookie: {sticky}")
+                other = "primary" if expected == "replica" else "replica"
+                if not counts[expected] or counts[other]:
+                    failures.append(label)
+        for group in (database.async_engine, *database.async_replica_engines):
+            await group.dispose()
+        return failures
+
+    failures = asyncio.run(run())
+    if failures:
+        raise SystemExit("Неочікувана маршрутизація: " + ", ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
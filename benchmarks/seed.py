@@ -0,0 +1,76 @@
+"""Заповнення бази тестовими даними для бенчмарків."""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import models
+
+CITIES = ["Київ", "Львів", "Одеса", "Харків", "Дніпро", "Запоріжжя", "Кривий Ріг", "Миколаїв", "Черкаси"]
+STREETS = ["Хрещатик", "Шевченка", "Франка", "Лесі Українки", "Грушевського", "Сагайдачного", "Соборна"]
+STATUSES = ["approved", "approved", "approved", "pending", "rejected"]
+WORDS = ["затишна", "простора", "світла", "квартира", "студія", "центр", "метро", "ремонт", "балкон", "парк"]
+
+BATCH_SIZE = 10000
+
+
+def _batched(rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def seed(engine, users=100, apartments=1000, locations=None, random_seed=42):
+    """
+    Створює таблиці та заповнює їх users користувачами і apartments оголошеннями.
+    Перший користувач — адміністратор з email admin@example.com.
+    """
+    rnd = random.Random(random_seed)
+    locations = locations or apartments
+    models.Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1)
+
+    user_rows = [
+        {
+            "id": i,
+            "email": "admin@example.com" if i == 1 else f"user{i}@example.com",
+            "password": "password",
+            "first_name": f"Name{i}",
+            "last_name": f"Surname{i}",
+            "phone": f"{i:010d}",
+            "is_admin": i == 1,
+            "is_active": rnd.random() > 0.05,
+            "created_at": start,
+        }
+        for i in range(1, users + 1)
+    ]
+    location_rows = [
+        {
+            "id": i,
+            "city": rnd.choice(CITIES),
+            "street": rnd.choice(STREETS),
+            "house_number": str(i),
+        }
+        for i in range(1, locations + 1)
+    ]
+    apartment_rows = [
+        {
+            "id": i,
+            "title": f"Квартира {i} " + " ".join(rnd.sample(WORDS, 2)),
+            "description": " ".join(rnd.choices(WORDS, k=12)),
+            "price": rnd.randrange(3000, 60000, 500),
+            "owner_id": rnd.randint(1, users),
+            "location_id": rnd.randint(1, locations),
+            "status": rnd.choice(STATUSES),
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i in range(1, apartments + 1)
+    ]
+
+    with engine.begin() as connection:
+        for table, rows in (
+            (models.User, user_rows),
+            (models.Location, location_rows),
+            (models.Apartment, apartment_rows),
+        ):
+            for batch in _batched(rows):
+                connection.execute(insert(table), batch)
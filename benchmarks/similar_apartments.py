@@ -0,0 +1,71 @@
+"""
+Індекс схожих оголошень: час побудови, інкрементального оновлення та пошуку top-k.
+
+Запуск: python -m benchmarks.similar_apartments [--apartments 100000] [--changes 100] [--k 4]
+    [--url mysql+mysqlconnector://... --async-url mysql+aiomysql://...]
+Без --url використовується тимчасова SQLite база. Для MySQL база має бути порожньою.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app import migrations, models
+from benchmarks.seed import seed
+
+LOOKUPS = 2000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apartments", type=int, default=100000)
+    parser.add_argument("--changes", type=int, default=100, help="змінених оголошень між оновленнями")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--url")
+    parser.add_argument("--async-url")
+    args = parser.parse_args()
+
+    if args.url:
+        url, async_url = args.url, args.async_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        url, async_url = "sqlite:///" + path, "sqlite+aiosqlite:///" + path
+    # app.config читає адреси БД під час імпорту, а індекс імпортує app.database для вибору бази
+    os.environ["DATABASE_URL"], os.environ["ASYNC_DATABASE_URL"] = url, async_url
+    from app.recommendations import SimilarityIndex
+
+    engine = create_engine(url)
+    migrations.migrate(engine)
+    seed(engine, users=1000, apartments=args.apartments)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        index = SimilarityIndex()
+        started = time.perf_counter()
+        index.refresh(db)
+        print(f"{'full build':>22}: {(time.perf_counter() - started) * 1000:9.2f} ms, {index.stats()['rows']} rows")
+
+        ids = [row.id for row in db.query(models.Apartment.id).filter(models.Apartment.status == "approved").limit(args.changes)]
+        db.execute(update(models.Apartment).where(models.Apartment.id.in_(ids)).values(price=models.Apartment.price + 1))
+        db.commit()
+        index.mark_changed(*ids)
+        started = time.perf_counter()
+        index.refresh(db)
+        print(f"{f'{args.changes} changes refresh':>22}: {(time.perf_counter() - started) * 1000:9.2f} ms")
+
+        apartments = db.query(models.Apartment).options(joinedload(models.Apartment.location)).limit(LOOKUPS).all()
+        timings = []
+        for apartment in apartments:
+            started = time.perf_counter()
+            index.similar(apartment, args.k)
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=100)
+        print(f"{f'top-{args.k} lookup':>22}: median {statistics.median(timings):.3f} ms, p99 {quantiles[98]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
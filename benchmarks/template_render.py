@@ -0,0 +1,141 @@
+"""
+Шаблони: старт воркера з кешем байт-коду та без нього, повна головна сторінка проти потокової.
+
+Головна сторінка запитується через справжній маршрут app.main на тимчасовій SQLite базі
+з різними оголошеннями (до MAX_PAGE_SIZE на сторінці). Застосунок викликається напряму
+як ASGI, щоб побачити момент першого шматка тіла: httpx.ASGITransport збирає відповідь
+цілком. Для кожного розміру сторінки вимірюються медіани часу до першого байта та до
+останнього (з порожнім кешем карток і з заповненим) і пікова пам'ять (tracemalloc) на запит.
+
+Запуск: python -m benchmarks.template_render [--apartments 2000] [--limits 20 100]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+
+from app import migrations
+from benchmarks.seed import seed
+
+DIRECTORY = "app/templates"
+REPEAT = 20
+
+
+def startup_ms(templating, cache_dir):
+    """Час завантаження всіх шаблонів новим воркером, мс."""
+    templates = templating.create_templates(DIRECTORY, cache_dir=cache_dir)
+    started = time.perf_counter()
+    for name in templates.env.list_templates():
+        templates.get_template(name)
+    return (time.perf_counter() - started) * 1000
+
+
+async def get(app, path, query_string):
+    """(статус, час до першого шматка тіла в мс, час до кінця відповіді в мс, розмір тіла)."""
+    done = asyncio.Event()
+    requested = False
+    status, first, size = None, None, 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Поки відповідь не віддана, клієнт на зв'язку: StreamingResponse слухає відключення
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if first is None:
+                first = time.perf_counter()
+            size += len(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query_string.encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    started = time.perf_counter()
+    await app(scope, receive, send)
+    finished = time.perf_counter()
+    done.set()
+    return status, (first - started) * 1000, (finished - started) * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apartments", type=int, default=2000)
+    parser.add_argument("--limits", type=int, nargs="+", default=[20, 100])
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    # app.config читає адреси БД під час імпорту, тож модулі застосунку імпортуємо після їх встановлення
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + path,
+        "ASYNC_DATABASE_URL": "sqlite+aiosqlite:///" + path,
+        "TEMPLATE_CACHE_DIR": cache_dir,
+    })
+    from app import templating
+
+    print(f"{'startup, no cache':>30}: {startup_ms(templating, tempfile.mkdtemp()):8.2f} ms")
+    startup_ms(templating, cache_dir)
+    print(f"{'startup, bytecode cache':>30}: {startup_ms(templating, cache_dir):8.2f} ms")
+
+    engine = create_engine("sqlite:///" + path)
+    migrations.migrate(engine)
+    seed(engine, users=200, apartments=args.apartments)
+    engine.dispose()
+
+    from app import database
+    from app.fragments import card_cache
+    from app.main import app
+
+    async def measure(limit, stream, cold):
+        # page_response читає прапорець під час кожного виклику: те саме, що STREAM_TEMPLATES для воркера
+        templating.STREAM_TEMPLATES = stream
+        first, total = [], []
+        for _ in range(REPEAT):
+            if cold:
+                card_cache.clear()
+            status, ttfb, elapsed, size = await get(app, "/", f"limit={limit}")
+            assert status == 200, status
+            first.append(ttfb)
+            total.append(elapsed)
+
+        if cold:
+            card_cache.clear()
+        tracemalloc.start()
+        await get(app, "/", f"limit={limit}")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return statistics.median(first), statistics.median(total), peak / 1024, size
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            # Перший потік threadpool і перший запит до БД не рахуємо
+            await measure(args.limits[0], True, False)
+            for limit in args.limits:
+                for cold in (True, False):
+                    for stream in (False, True):
+                        ttfb, elapsed, peak, size = await measure(limit, stream, cold)
+                        label = f"{limit} cards, {'cold' if cold else 'warm'}, {'streamed' if stream else 'full'}"
+                        print(f"{label:>30}: TTFB {ttfb:7.2f} ms, total {elapsed:7.2f} ms, "
+                              f"peak memory {peak:7.1f} KB, {size // 1024} KB page")
+        await database.async_engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()